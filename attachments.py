@@ -0,0 +1,215 @@
+"""
+Streaming ingestion of chat exports attached to subnet TLDR requests.
+
+AttachmentReader.ingest() reads every supported attachment on a message —
+.txt, .gz (one gzipped text file) and .zip (its .txt members) — in
+`chunk_size` pieces straight from the CDN URL. Bytes go through an
+incremental UTF-8 decoder and are cut into lines as they arrive, so a
+partial line or split multi-byte character never needs the whole file in
+memory. Each line is normalized (CRLF, whitespace runs, Discord export
+{Attachments}/{Reactions}/{Embed} blocks, repeated blank lines). Reading
+stops at `max_bytes` downloaded per file or `max_chars` of text in total;
+a .zip is spooled to a temp file (its index is at the end) and its members
+are then streamed the same way.
+"""
+import codecs
+import re
+import tempfile
+import zipfile
+import zlib
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable, List, Optional
+
+import aiohttp
+
+TEXT_SUFFIXES = (".txt", ".log", ".md")
+_SPACES = re.compile(r"[ \t\u00a0]+")
+# DiscordChatExporter plain-text blocks: a marker line, then URLs / emoji until a blank line
+_EXPORT_BLOCK = re.compile(r"^\{(Attachments|Reactions|Embed|Stickers)\}$")
+
+
+@dataclass
+class Ingested:
+    text: str = ""
+    files: List[str] = field(default_factory=list)    # names actually read (zip members as "a.zip/b.txt")
+    skipped: List[str] = field(default_factory=list)  # "name: reason" for exports that couldn't be read
+    ignored: List[str] = field(default_factory=list)  # other attachments (images, ...)
+    bytes_read: int = 0
+    truncated: bool = False
+
+
+class _LineSink:
+    """Incremental bytes -> normalized lines, bounded by max_chars."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.lines: List[str] = []
+        self.chars = 0
+        self.full = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial = ""
+        self._in_block = False
+        self._blank = True  # suppress leading blank lines
+
+    def start_file(self, header: Optional[str] = None) -> None:
+        self._decoder.reset()
+        self._partial = ""
+        self._in_block = False
+        if header:
+            if self.lines and self.lines[-1]:
+                self._emit("")
+            self._emit(header)
+            self._blank = False
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        text = self._partial + self._decoder.decode(data, final)
+        lines = text.split("\n")
+        self._partial = "" if final else lines.pop()
+        for line in lines:
+            if self.full:
+                return
+            self._line(line)
+        room = self.max_chars - self.chars - 1
+        if len(self._partial) > room:
+            # a line longer than all the text still allowed: keep what fits and stop reading
+            self._line(self._partial[:max(0, room)])
+            self._partial = ""
+            self.full = True
+
+    def _line(self, line: str) -> None:
+        line = _SPACES.sub(" ", line.replace("\r", "").lstrip("\ufeff")).strip()
+        if self._in_block:
+            if line:
+                return
+            self._in_block = False
+        if _EXPORT_BLOCK.match(line):
+            self._in_block = True
+            return
+        if not line:
+            if self._blank:
+                return
+            self._blank = True
+        else:
+            self._blank = False
+        self._emit(line)
+
+    def _emit(self, line: str) -> None:
+        if self.chars + len(line) + 1 > self.max_chars:
+            self.full = True
+            return
+        self.lines.append(line)
+        self.chars += len(line) + 1
+
+    def text(self) -> str:
+        return "\n".join(self.lines).strip()
+
+
+class AttachmentReader:
+    def __init__(self, max_bytes: int = 50 * 1024 * 1024, max_chars: int = 1_000_000, chunk_size: int = 64 * 1024):
+        self.max_bytes = max_bytes    # downloaded (compressed) bytes per attachment
+        self.max_chars = max_chars    # normalized text kept across all attachments
+        self.chunk_size = chunk_size
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    @staticmethod
+    def supported(filename: str) -> bool:
+        name = (filename or "").lower()
+        return name.endswith(TEXT_SUFFIXES) or name.endswith((".gz", ".zip"))
+
+    async def _chunks(self, att, out: Ingested) -> AsyncIterator[bytes]:
+        """Raw bytes of one attachment, chunk by chunk, stopping at max_bytes."""
+        read = 0
+        if getattr(att, "url", ""):
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, sock_read=60))
+            async with self._session.get(att.url) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.content.iter_chunked(self.chunk_size):
+                    yield chunk[: self.max_bytes - read]
+                    read += len(chunk)
+                    if read >= self.max_bytes:
+                        out.truncated = True
+                        return
+        else:  # objects without a URL (tests, bench) only offer read()
+            data = await att.read()
+            if len(data) > self.max_bytes:
+                data, out.truncated = data[: self.max_bytes], True
+            for i in range(0, len(data), self.chunk_size):
+                yield data[i:i + self.chunk_size]
+
+    async def ingest(self, attachments: Iterable) -> Ingested:
+        out = Ingested()
+        sink = _LineSink(self.max_chars)
+        usable = []
+        for att in attachments:
+            name = getattr(att, "filename", "") or "attachment"
+            if self.supported(name):
+                usable.append((att, name))
+            else:
+                out.ignored.append(name)
+        labelled = len(usable) > 1  # a "--- name ---" line between files
+        for att, name in usable:
+            if sink.full:
+                out.skipped.append(f"{name}: text limit reached")
+                continue
+            try:
+                if name.lower().endswith(".zip"):
+                    await self._read_zip(att, name, sink, out, labelled)
+                else:
+                    await self._read_stream(att, name, sink, out, labelled)
+            except (aiohttp.ClientError, OSError, zlib.error, zipfile.BadZipFile, EOFError) as e:
+                out.skipped.append(f"{name}: {e!r}")
+        out.text = sink.text()
+        out.truncated = out.truncated or sink.full
+        return out
+
+    async def _read_stream(self, att, name: str, sink: _LineSink, out: Ingested, labelled: bool) -> None:
+        gz = zlib.decompressobj(16 + zlib.MAX_WBITS) if name.lower().endswith(".gz") else None
+        sink.start_file(f"--- {name} ---" if labelled else None)
+        async with aclosing(self._chunks(att, out)) as chunks:  # stop the download as soon as the sink is full
+            async for chunk in chunks:
+                out.bytes_read += len(chunk)
+                if gz is None:
+                    sink.feed(chunk)
+                else:
+                    # bounded inflate: a small .gz can't expand past what the sink will keep
+                    data = gz.decompress(chunk, self.chunk_size)
+                    while True:
+                        sink.feed(data)
+                        if sink.full or not gz.unconsumed_tail:
+                            break
+                        data = gz.decompress(gz.unconsumed_tail, self.chunk_size)
+                if sink.full:
+                    break
+        sink.feed(b"", final=True)
+        out.files.append(name)
+
+    async def _read_zip(self, att, name: str, sink: _LineSink, out: Ingested, labelled: bool) -> None:
+        with tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024) as spool:
+            async with aclosing(self._chunks(att, out)) as chunks:
+                async for chunk in chunks:
+                    out.bytes_read += len(chunk)
+                    spool.write(chunk)
+            spool.seek(0)
+            with zipfile.ZipFile(spool) as zf:
+                members = [i for i in zf.infolist() if not i.is_dir() and i.filename.lower().endswith(TEXT_SUFFIXES)]
+                if not members:
+                    out.skipped.append(f"{name}: no .txt files inside")
+                for info in members:
+                    if sink.full:
+                        out.skipped.append(f"{name}/{info.filename}: text limit reached")
+                        continue
+                    sink.start_file(f"--- {name}/{info.filename} ---" if labelled or len(members) > 1 else None)
+                    with zf.open(info) as member:
+                        while not sink.full:
+                            data = member.read(self.chunk_size)
+                            if not data:
+                                break
+                            sink.feed(data)
+                    sink.feed(b"", final=True)
+                    out.files.append(f"{name}/{info.filename}")
@@ -0,0 +1,130 @@
+"""
+Seeded synthetic KOL corpora.
+
+write_jsonl_corpus() lays down {handle}.jsonl files in the scraper's record
+format (originals, replies, retweets and quotes spread over the last few
+days, with outlinks and media), which the post store imports on first open.
+FakeTwikitClient serves the same kind of tweets through twikit's
+get_user_by_screen_name / get_user_tweets / .next() surface, so
+scraper_twikit.run_once() can be driven without X.
+"""
+import asyncio
+import datetime as dt
+import json
+import random
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+WORDS = (
+    "subnet emissions validators miners dTAO alpha staking root weights yuma consensus "
+    "bittensor inference training compute registration burn halving liquidity pool "
+    "taostats roadmap launch mainnet testnet upgrade incentive"
+).split()
+
+
+def make_handles(n: int) -> List[str]:
+    return [f"kol_{i:05d}" for i in range(n)]
+
+
+def make_text(rng: random.Random, n_words: int) -> str:
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    if rng.random() < 0.5:
+        words.append(f"#{rng.choice(WORDS)}")
+    if rng.random() < 0.4:
+        words.append(f"https://t.co/{rng.getrandbits(40):x}")
+    return " ".join(words).capitalize() + "."
+
+
+# the same announcements copied by several KOLs (what story dedup should fold together)
+SHARED_STORIES = [make_text(random.Random(10_000 + n), 40) for n in range(20)]
+
+
+def make_records(rng: random.Random, handle: str, n_posts: int, now: dt.datetime, days: float = 3.0) -> List[Dict]:
+    """Newest-first scraper records spread uniformly over the last `days`; ~10% repost a shared story."""
+    base_id = 1_800_000_000_000_000_000 + rng.getrandbits(40)
+    ages = sorted(rng.uniform(0, days * 86400) for _ in range(n_posts))
+    records = []
+    for i, age in enumerate(ages):
+        kind = rng.choices(["original", "reply", "retweet", "quote"], weights=[6, 2, 1, 1])[0]
+        story = rng.randrange(len(SHARED_STORIES)) if rng.random() < 0.1 else None
+        records.append({
+            "id": str(base_id - i),
+            "content": make_text(rng, rng.randint(8, 60)) if story is None else SHARED_STORIES[story],
+            "date": (now - dt.timedelta(seconds=age)).isoformat(),
+            "retweetedTweet": {} if kind == "retweet" else None,
+            "inReplyToTweetId": "x" if kind == "reply" else None,
+            "quotedTweet": {} if kind == "quote" else None,
+            # shared stories are linked with and without share-tracking tags (canonicalized before matching)
+            "outlinks": [f"https://blog.bittensor.com/story-{story}" + rng.choice(["", "?utm_source=twitter"])] if story is not None else
+            [f"https://{rng.choice(['taostats.io', 'github.com', 'x.com'])}/{handle}/{i}"] if rng.random() < 0.3 else [],
+            "media": [{"fullUrl": f"https://pbs.twimg.com/media/{handle}_{i}.jpg"}] if rng.random() < 0.15 else [],
+        })
+    return records
+
+
+def write_jsonl_corpus(folder: Path, handles: List[str], posts_per_handle: int, seed: int = 1) -> int:
+    rng = random.Random(seed)
+    now = dt.datetime.now(dt.timezone.utc)
+    total = 0
+    for handle in handles:
+        records = make_records(rng, handle, posts_per_handle, now)
+        with (Path(folder) / f"{handle}.jsonl").open("w", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec) + "\n")
+        total += len(records)
+    return total
+
+
+class _Page(list):
+    """A list of tweets with twikit's async `next()` cursor."""
+
+    def __init__(self, tweets, rest, page_size, latency):
+        super().__init__(tweets)
+        self._rest = rest
+        self._page_size = page_size
+        self._latency = latency
+
+    async def next(self) -> "_Page":
+        await asyncio.sleep(self._latency)
+        head, rest = self._rest[: self._page_size], self._rest[self._page_size:]
+        return _Page(head, rest, self._page_size, self._latency)
+
+
+class FakeTwikitClient:
+    """Serves seeded timelines; `latency` is the simulated per-request round trip."""
+
+    def __init__(self, handles: List[str], posts_per_handle: int = 40, seed: int = 1,
+                 page_size: int = 20, latency: float = 0.05):
+        rng = random.Random(seed)
+        now = dt.datetime.now(dt.timezone.utc)
+        self.page_size = page_size
+        self.latency = latency
+        self.requests = 0
+        self._timelines: Dict[str, List[SimpleNamespace]] = {}
+        for n, handle in enumerate(handles):
+            self._timelines[str(n)] = [
+                SimpleNamespace(
+                    id=int(r["id"]),
+                    full_text=r["content"],
+                    created_at_datetime=dt.datetime.fromisoformat(r["date"]),
+                    is_retweet=r["retweetedTweet"] is not None,
+                    is_reply=r["inReplyToTweetId"] is not None,
+                    is_quote=r["quotedTweet"] is not None,
+                    entities={"urls": [{"expanded_url": u} for u in r["outlinks"]]},
+                    media=[{"media_url_https": m["fullUrl"]} for m in r["media"]],
+                )
+                for r in make_records(rng, handle, posts_per_handle, now)
+            ]
+        self._ids = {h: str(n) for n, h in enumerate(handles)}
+
+    async def get_user_by_screen_name(self, handle: str):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(id=self._ids[handle])
+
+    async def get_user_tweets(self, user_id: str, kind: str = "Tweets"):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        timeline = self._timelines[user_id]
+        return _Page(timeline[: self.page_size], timeline[self.page_size:], self.page_size, self.latency)
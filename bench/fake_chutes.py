@@ -0,0 +1,102 @@
+"""
+Local stand-in for the Chutes chat-completions endpoint.
+
+Serves POST /v1/chat/completions with configurable latency and injected
+faults (HTTP errors with Retry-After, garbage bodies, missing `choices`),
+in both plain JSON and server-sent-event streaming modes. Batched KOL
+prompts (### @handle blocks) and shared-story prompts (### S1 blocks) get
+a JSON answer keyed by handle / label, so the digest's batch parser is
+exercised too.
+
+    python -m bench.fake_chutes --port 8080 --latency 0.8 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+from dataclasses import dataclass, field
+from typing import List
+
+from aiohttp import web
+
+_HANDLE_BLOCK = re.compile(r"^### @?(\S+)", re.MULTILINE)
+
+
+@dataclass
+class FaultConfig:
+    latency: float = 0.5           # mean seconds before the first byte
+    jitter: float = 0.2            # +/- uniform jitter on latency
+    token_delay: float = 0.01      # seconds between streamed chunks
+    error_rate: float = 0.0        # share of requests that fail
+    error_statuses: List[int] = field(default_factory=lambda: [429, 500, 503])
+    retry_after: float = 0.2       # sent with 429/503
+    garbage_rate: float = 0.0      # share of 200s with a non-JSON / choice-less body
+    requests: int = 0
+    errors: int = 0
+    completion_words: int = 60
+
+
+def _answer(prompt: str, cfg: FaultConfig) -> str:
+    handles = _HANDLE_BLOCK.findall(prompt)
+    if handles:
+        return json.dumps({h: f"@{h} summary: " + " ".join(["signal"] * 20) for h in handles})
+    return "**Executive summary** " + " ".join(["insight"] * cfg.completion_words)
+
+
+def make_app(cfg: FaultConfig) -> web.Application:
+    async def completions(request: web.Request) -> web.StreamResponse:
+        cfg.requests += 1
+        body = await request.json()
+        await asyncio.sleep(max(0.0, cfg.latency + random.uniform(-cfg.jitter, cfg.jitter)))
+
+        if random.random() < cfg.error_rate:
+            cfg.errors += 1
+            status = random.choice(cfg.error_statuses)
+            headers = {"Retry-After": f"{cfg.retry_after:g}"} if status in (429, 503) else {}
+            return web.Response(status=status, text="injected fault", headers=headers)
+        if random.random() < cfg.garbage_rate:
+            cfg.errors += 1
+            return random.choice([web.Response(text="<html>bad gateway</html>"), web.json_response({"detail": "overloaded"})])
+
+        prompt = body["messages"][0]["content"]
+        text = _answer(prompt, cfg)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4}
+
+        if not body.get("stream"):
+            return web.json_response({"choices": [{"message": {"role": "assistant", "content": text}}], "usage": usage})
+
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        for word in re.findall(r"\S+\s*", text):
+            chunk = {"choices": [{"delta": {"content": word}}]}
+            await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(cfg.token_delay)
+        await resp.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode())
+        await resp.write(b"data: [DONE]\n\n")
+        return resp
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    return app
+
+
+async def start(cfg: FaultConfig, host: str = "127.0.0.1", port: int = 0):
+    """Start the server; returns (runner, url). port=0 picks a free port."""
+    runner = web.AppRunner(make_app(cfg))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound}/v1/chat/completions"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--latency", type=float, default=0.5)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--garbage-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    cfg = FaultConfig(latency=args.latency, error_rate=args.error_rate, garbage_rate=args.garbage_rate)
+    web.run_app(make_app(cfg), host="127.0.0.1", port=args.port)
@@ -0,0 +1,85 @@
+"""
+Just enough of discord.py's object model to drive bot.py's handlers offline.
+
+FakeChannel records every send/edit (with a configurable per-call delay, so
+the sender's pacing is measured against something realistic); FakeMessage
+and FakeAttachment mimic the incoming messages route_message() reads.
+"""
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+_ids = itertools.count(10_000)
+
+
+@dataclass
+class FakeUser:
+    id: int
+    name: str = "bench-user"
+    bot: bool = False
+
+
+@dataclass
+class FakeAttachment:
+    filename: str
+    data: bytes
+    url: str = ""
+
+    async def read(self) -> bytes:
+        return self.data
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, name: str = "", send_delay: float = 0.05):
+        self.id = channel_id
+        self.name = name or f"chan-{channel_id}"
+        self.send_delay = send_delay  # simulated Discord API round trip
+        self.sent: List["FakeMessage"] = []
+        self.edits = 0
+        self.send_times: List[float] = []
+
+    async def send(self, content: Optional[str] = None, embeds=None, **_kwargs) -> "FakeMessage":
+        await asyncio.sleep(self.send_delay)
+        msg = FakeMessage(content=content or "", channel=self, author=FakeUser(1, "bot", bot=True), embeds=embeds or [])
+        self.sent.append(msg)
+        self.send_times.append(time.monotonic())
+        return msg
+
+    def __repr__(self) -> str:
+        return f"<FakeChannel {self.id}>"
+
+
+@dataclass
+class FakeMessage:
+    content: str
+    channel: FakeChannel
+    author: FakeUser
+    attachments: List[FakeAttachment] = field(default_factory=list)
+    embeds: list = field(default_factory=list)
+    reference: object = None
+    id: int = field(default_factory=lambda: next(_ids))
+
+    async def edit(self, content: Optional[str] = None, **_kwargs) -> "FakeMessage":
+        await asyncio.sleep(self.channel.send_delay)
+        self.channel.edits += 1
+        if content is not None:
+            self.content = content
+        return self
+
+
+class FakeGuild:
+    """Maps channel ids to FakeChannels; stands in for bot.get_channel / fetch_channel."""
+
+    def __init__(self, send_delay: float = 0.05):
+        self.send_delay = send_delay
+        self.channels = {}
+
+    def get_channel(self, channel_id: int) -> FakeChannel:
+        if channel_id not in self.channels:
+            self.channels[channel_id] = FakeChannel(channel_id, send_delay=self.send_delay)
+        return self.channels[channel_id]
+
+    async def fetch_channel(self, channel_id: int) -> FakeChannel:
+        return self.get_channel(channel_id)
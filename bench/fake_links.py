@@ -0,0 +1,64 @@
+"""
+Local stand-in for a link shortener, for the Links & Media pipeline.
+
+GET/HEAD /s/{code} answers 301 to /r/{code} (a second hop on the same
+host, like t.co -> bit.ly), which answers 302 to the code's target URL with
+tracking parameters attached. Codes in `dead` answer 404. Every request is
+counted, so a second run served from the expansion cache shows up as zero
+new requests.
+
+    python -m bench.fake_links --port 8081
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+from typing import Set
+
+from aiohttp import web
+
+
+@dataclass
+class RedirectConfig:
+    latency: float = 0.05          # seconds per hop
+    dead: Set[str] = field(default_factory=set)
+    requests: int = 0
+
+
+def target_url(code: str) -> str:
+    """Where /s/{code} ends up (before canonicalization)."""
+    return f"https://github.com/opentensor/{code}?utm_source=twitter&utm_medium=social"
+
+
+def make_app(cfg: RedirectConfig) -> web.Application:
+    async def hop(request: web.Request) -> web.Response:
+        cfg.requests += 1
+        await asyncio.sleep(cfg.latency)
+        code = request.match_info["code"]
+        if code in cfg.dead:
+            raise web.HTTPNotFound()
+        if request.path.startswith("/s/"):
+            raise web.HTTPMovedPermanently(f"/r/{code}")
+        raise web.HTTPFound(target_url(code))
+
+    app = web.Application()
+    app.router.add_route("*", "/s/{code}", hop)
+    app.router.add_route("*", "/r/{code}", hop)
+    return app
+
+
+async def start(cfg: RedirectConfig, host: str = "127.0.0.1", port: int = 0):
+    """Start the server; returns (runner, base URL). port=0 picks a free port."""
+    runner = web.AppRunner(make_app(cfg))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound}"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--port", type=int, default=8081)
+    ap.add_argument("--latency", type=float, default=0.05)
+    args = ap.parse_args()
+    web.run_app(make_app(RedirectConfig(latency=args.latency)), host="127.0.0.1", port=args.port)
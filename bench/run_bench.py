@@ -0,0 +1,344 @@
+"""
+Offline benchmark for the bot's hot paths.
+
+Runs bot.py's real handlers against a local fake Chutes server, fake Discord
+channels and a seeded synthetic KOL corpus, so changes can be compared
+before/after without Discord, X or a Chutes token:
+
+    python -m bench.run_bench                        # all scenarios, defaults
+    python -m bench.run_bench --scenarios read,digest --handles 2000
+    python -m bench.run_bench --kimi-latency 1.5 --error-rate 0.1 --json after.json
+
+Scenarios
+  read     get_posts_24h() for every handle of a large corpus (post store query)
+  scrape   scraper_twikit.run_once() against a fake twikit client
+  digest   daily_kol_summary() end to end: scrape, batched Kimi calls, packed sends
+  precompute  precompute_digest(), then the 8:00 post timed on its own (top-up only)
+  news     announcement bursts through the coalescer and the job queue (n = summaries)
+  subnet   .txt pastes in the curation channel (job queue, map-reduce + stream)
+  links    short links through a local redirect server: expansion cold, then cached;
+           Links & Media listed once per digest (n = short links)
+
+Everything (post store, scrape state, LLM and link caches, run log) lives in a temp dir.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import kols  # noqa: E402
+from bench import corpus, fake_chutes, fake_links  # noqa: E402
+from bench.fake_discord import FakeAttachment, FakeGuild, FakeMessage, FakeUser  # noqa: E402
+
+BENCH_USER_ID = 4242
+CURATION_CHANNEL_ID = 900_001
+NEWS_CHANNEL_ID = 900_002
+KOLS_CHANNEL_ID = 900_003
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    v = sorted(values)
+    return v[min(len(v) - 1, int(p * len(v)))]
+
+
+def report(name: str, latencies: List[float], wall: float, **extra) -> Dict:
+    row = {
+        "scenario": name,
+        "n": len(latencies),
+        "wall_s": round(wall, 3),
+        "per_s": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_s": round(percentile(latencies, 0.50), 4),
+        "p95_s": round(percentile(latencies, 0.95), 4),
+        "max_s": round(max(latencies, default=0.0), 4),
+        **extra,
+    }
+    print(
+        f"⏱️ {name:<7} n={row['n']:<6} wall={row['wall_s']:.2f}s {row['per_s']:.1f}/s "
+        f"p50={row['p50_s']:.3f}s p95={row['p95_s']:.3f}s max={row['max_s']:.3f}s"
+        + "".join(f" {k}={v}" for k, v in extra.items())
+    )
+    return row
+
+
+def configure_env(args, chutes_url: str, tmp: Path) -> None:
+    """bot.py reads its config at import time, so this must run first."""
+    os.environ.update({
+        "CHUTES_URL": chutes_url,
+        "CHUTES_API_TOKEN": "bench",
+        "CHUTES_MAX_CONCURRENCY": str(args.kimi_concurrency),
+        "DISCORD_CHANNEL_ID": str(KOLS_CHANNEL_ID),
+        "KOLS_CHANNEL_ID": str(KOLS_CHANNEL_ID),
+        "NEWS_UPDATES_CHANNEL_ID": str(NEWS_CHANNEL_ID),
+        "MY_USER_ID": str(BENCH_USER_ID),
+        "CURATION_CHANNEL_ID": str(CURATION_CHANNEL_ID),
+        "METRICS_PORT": "0",
+        "SCRAPE_RATE_PER_MIN": str(args.scrape_rate),
+        "SCRAPE_BURST": "50",
+        "SCRAPE_JITTER": "0",
+        "LLM_CACHE_TTL_HOURS": "24" if args.cache else "0",
+        "NEWS_COALESCE_SECONDS": str(args.news_window),
+        "LINK_SHORTENERS": "127.0.0.1",  # the local redirect server stands in for t.co
+    })
+    import post_store
+    post_store.STORE_FILE = tmp / "posts.sqlite3"
+
+
+async def scenario_read(bot, handles: List[str]) -> Dict:
+    from post_store import default_store
+    t = time.perf_counter()
+    default_store()  # first open imports the JSONL corpus; not part of the read timing
+    import_s = time.perf_counter() - t
+    latencies = []
+    start = time.perf_counter()
+    posts = 0
+    for h in handles:
+        t = time.perf_counter()
+        posts += len(bot.get_posts_24h(h))
+        latencies.append(time.perf_counter() - t)
+    return report("read", latencies, time.perf_counter() - start, posts=posts, import_s=round(import_s, 2))
+
+
+async def scenario_scrape(bot, handles: List[str], args) -> Dict:
+    import scraper_twikit
+    client = corpus.FakeTwikitClient(handles, args.posts, seed=args.seed, latency=args.x_latency)
+    scraper_twikit._default_client = client
+    kols.KOL_HANDLES[:] = handles  # the one list bot.py and the scraper both read
+    start = time.perf_counter()
+    await bot.run_scraper_once()
+    wall = time.perf_counter() - start
+    return report("scrape", list(scraper_twikit.last_run_latency.values()), wall, x_requests=client.requests)
+
+
+async def scenario_digest(bot, guild: FakeGuild, handles: List[str], args) -> Dict:
+    import scraper_twikit
+    scraper_twikit._default_client = corpus.FakeTwikitClient(handles, args.posts, seed=args.seed, latency=args.x_latency)
+    kols.KOL_HANDLES[:] = handles
+    channel = guild.get_channel(KOLS_CHANNEL_ID)
+    Path(bot.DIGEST_ARTIFACT_FILE).unlink(missing_ok=True)  # cold run: nothing pre-computed
+    sent_before = len(channel.sent)
+    start = time.perf_counter()
+    await bot.daily_kol_summary()
+    wall = time.perf_counter() - start
+    gaps = [b - a for a, b in zip(channel.send_times[sent_before:], channel.send_times[sent_before + 1:])]
+    return report("digest", [wall], wall, handles=len(handles), messages=len(channel.sent) - sent_before,
+                  max_send_gap_s=round(max(gaps, default=0.0), 3))
+
+
+async def scenario_precompute(bot, handles: List[str], args) -> Dict:
+    """precompute_digest() ahead of time, then the 8:00 post (n = 1, latency = the post only)."""
+    import scraper_twikit
+    scraper_twikit._default_client = corpus.FakeTwikitClient(handles, args.posts, seed=args.seed + 1, latency=args.x_latency)
+    kols.KOL_HANDLES[:] = handles
+    Path(bot.DIGEST_ARTIFACT_FILE).unlink(missing_ok=True)
+    t = time.perf_counter()
+    await bot.precompute_digest()
+    pre = time.perf_counter() - t
+    start = time.perf_counter()
+    await bot.daily_kol_summary()
+    wall = time.perf_counter() - start
+    return report("precompute", [wall], wall, handles=len(handles), precompute_s=round(pre, 2))
+
+
+async def run_routed(bot, msgs, kind: str) -> List[float]:
+    """route_message() only enqueues; wait for the jobs and time submit -> done."""
+    for m in msgs:
+        await bot.route_message(m, {"handler": "bench"})
+    await bot.news_coalescer.join()
+    await bot.job_queue.join()
+    done = [j for j in bot.job_queue.jobs() if j.kind == kind and not j.active][: len(msgs)]
+    for j in done:
+        if j.status != "done":
+            print(f"❌ bench job #{j.id} {j.status}: {j.error}")
+    return [j.finished_at - j.created_at for j in done]
+
+
+async def scenario_news(bot, guild: FakeGuild, args) -> Dict:
+    """Bursts from a few announcer bots; every 4th message cross-posts the previous one's text."""
+    channel = guild.get_channel(NEWS_CHANNEL_ID)
+    authors = [FakeUser(700 + a, f"announcer{a}") for a in range(args.news_authors)]
+    msgs = []
+    for i in range(args.news):
+        content = (msgs[-1].content if i % 4 == 3 else
+                   f"Announcement {i}: " + corpus.make_text(random.Random(i), 120) + f" https://blog.bittensor.com/{i}")
+        msgs.append(FakeMessage(content=content, channel=channel, author=authors[i % len(authors)]))
+    dup_before = bot.news_coalescer.duplicates
+    start = time.perf_counter()
+    latencies = await run_routed(bot, msgs, "news")
+    return report("news", latencies, time.perf_counter() - start, messages=len(msgs), edits=channel.edits,
+                  duplicates=bot.news_coalescer.duplicates - dup_before)
+
+
+async def scenario_subnet(bot, guild: FakeGuild, args) -> Dict:
+    channel = guild.get_channel(CURATION_CHANNEL_ID)
+    author = FakeUser(BENCH_USER_ID, "curator")
+    numbers = [label.rsplit("-", 1)[1] for label in bot.subnet_registry.mapped()]
+    rng = random.Random(args.seed)
+    lines, size = [], 0
+    while size < args.paste_kb * 1024:
+        lines.append(f"[10/17/2026 {rng.randint(0, 23)}:{rng.randint(0, 59):02d}] user{rng.randint(1, 50)}: "
+                     + corpus.make_text(rng, rng.randint(5, 40)))
+        size += len(lines[-1]) + 1
+    paste = "\n".join(lines).encode()
+    msgs = [
+        FakeMessage(
+            content=numbers[i % len(numbers)],
+            channel=channel,
+            author=author,
+            attachments=[FakeAttachment("convo.txt", paste + f"\n(paste {i})".encode())],
+        )
+        for i in range(args.subnet)
+    ]
+    start = time.perf_counter()
+    latencies = await run_routed(bot, msgs, "subnet")
+    return report("subnet", latencies, time.perf_counter() - start, paste_kb=args.paste_kb)
+
+
+async def scenario_links(bot, handles: List[str], args) -> Dict:
+    """Every handle links short URLs from a shared pool (some dead), and sometimes their targets directly."""
+    from posts import Post
+    cfg = fake_links.RedirectConfig(latency=args.link_latency)
+    runner, base = await fake_links.start(cfg)
+    rng = random.Random(args.seed)
+    codes = [f"c{n:04d}" for n in range(max(1, args.links // 3))]
+    cfg.dead = set(codes[::10])
+    posts_by_handle = {
+        h: [
+            Post(id=f"{h}-{i}", handle=h, created_at=time.time(), text="",
+                 links=[f"{base}/s/{rng.choice(codes)}" if rng.random() < 0.8 else
+                        fake_links.target_url(rng.choice(codes)).replace("github.com", "www.github.com")])
+            for i in range(max(1, args.links // len(handles)))
+        ]
+        for h in handles
+    }
+    short = {p.links[0] for posts in posts_by_handle.values() for p in posts if p.links[0].startswith(base)}
+    try:
+        start = time.perf_counter()
+        expanded = await bot.expand_digest_links(posts_by_handle)
+        cold = time.perf_counter() - start
+        cold_requests = cfg.requests
+        t = time.perf_counter()
+        await bot.expand_digest_links(posts_by_handle)
+        warm = time.perf_counter() - t
+    finally:
+        await runner.cleanup()
+    seen: set = set()
+    listed = sum(len(bot.collect_kol_urls(posts, expanded, seen)) for posts in posts_by_handle.values())
+    raw = sum(len(p.links) for posts in posts_by_handle.values() for p in posts)
+    return report("links", [cold], cold, short=len(short), expanded=len(expanded), requests=cold_requests,
+                  warm_s=round(warm, 4), warm_requests=cfg.requests - cold_requests, raw=raw, listed=listed)
+
+
+async def main(args) -> List[Dict]:
+    cfg = fake_chutes.FaultConfig(
+        latency=args.kimi_latency, jitter=args.kimi_latency / 4, token_delay=args.token_delay,
+        error_rate=args.error_rate, garbage_rate=args.garbage_rate,
+    )
+    runner, url = await fake_chutes.start(cfg)
+    tmp = Path(tempfile.mkdtemp(prefix="bot-bench-"))
+    configure_env(args, url, tmp)
+
+    handles = corpus.make_handles(args.handles)
+    n = corpus.write_jsonl_corpus(tmp, handles, args.posts, seed=args.seed)
+    print(f"🧪 corpus: {len(handles)} handles / {n} posts in {tmp}")
+
+    import bot as botmod
+    import scraper_twikit
+    from discord_sender import ChannelSender
+    from links import LinkExpander
+    from llm_cache import LLMCache
+
+    scraper_twikit.OUT_DIR = tmp
+    scraper_twikit.STATE_FILE = tmp / "scrape_state.json"
+    botmod.llm_cache.close()
+    botmod.llm_cache = LLMCache(tmp / "llm_cache.sqlite3", ttl_seconds=botmod.llm_cache.ttl_seconds)
+    le = botmod.link_expander
+    await le.close()
+    botmod.link_expander = LinkExpander(tmp / "link_cache.sqlite3", concurrency=le.concurrency, timeout=le.timeout,
+                                        shorteners=le.shorteners.domains, on_result=le.on_result)
+    botmod.DIGEST_RUNS_FILE = str(tmp / "digest_runs.jsonl")
+    botmod.DIGEST_ARTIFACT_FILE = str(tmp / "digest_artifact.json")
+    botmod.sender = ChannelSender(on_sent=botmod.record_discord_send)
+    guild = FakeGuild(send_delay=args.send_delay)
+    botmod.bot.get_channel = guild.get_channel
+    botmod.bot.fetch_channel = guild.fetch_channel
+
+    async def no_commands(_message):
+        return None
+    botmod.bot.process_commands = no_commands  # command parsing isn't what's measured here
+
+    rows = []
+    scenarios = args.scenarios.split(",")
+    try:
+        if "read" in scenarios:
+            rows.append(await scenario_read(botmod, handles))
+        if "scrape" in scenarios:
+            rows.append(await scenario_scrape(botmod, handles[: args.digest_handles], args))
+        if "digest" in scenarios:
+            rows.append(await scenario_digest(botmod, guild, handles[: args.digest_handles], args))
+        if "precompute" in scenarios:
+            rows.append(await scenario_precompute(botmod, handles[: args.digest_handles], args))
+        if "news" in scenarios:
+            rows.append(await scenario_news(botmod, guild, args))
+        if "subnet" in scenarios:
+            rows.append(await scenario_subnet(botmod, guild, args))
+        if "links" in scenarios:
+            rows.append(await scenario_links(botmod, handles[: args.digest_handles], args))
+    finally:
+        await botmod.job_queue.close()
+        await botmod.kimi.close()
+        await botmod.sender.close()
+        await botmod.link_expander.close()
+        await runner.cleanup()
+
+    print(f"🤖 fake Chutes: {cfg.requests} requests, {cfg.errors} injected faults; "
+          f"breaker={botmod.kimi.breaker.state}, hedges={botmod.kimi.hedges_fired}")
+    if args.verbose:
+        from metrics import summary_lines
+        print("\n".join(summary_lines()))
+    return rows
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Offline benchmark for the bot's hot paths.")
+    ap.add_argument("--scenarios", default="read,scrape,digest,precompute,news,subnet,links")
+    ap.add_argument("--handles", type=int, default=1000, help="handles in the synthetic corpus (read scenario)")
+    ap.add_argument("--posts", type=int, default=40, help="posts per handle")
+    ap.add_argument("--digest-handles", type=int, default=40, help="handles scraped and summarized by scrape/digest")
+    ap.add_argument("--news", type=int, default=12, help="announcement messages posted at once")
+    ap.add_argument("--news-authors", type=int, default=3, help="announcer accounts the messages come from")
+    ap.add_argument("--news-window", type=float, default=0.5, help="NEWS_COALESCE_SECONDS for the run")
+    ap.add_argument("--subnet", type=int, default=5, help="concurrent subnet pastes")
+    ap.add_argument("--paste-kb", type=int, default=120, help="size of each subnet paste")
+    ap.add_argument("--links", type=int, default=600, help="links posted across the digest handles (links scenario)")
+    ap.add_argument("--link-latency", type=float, default=0.05, help="local redirect server delay per hop (s)")
+    ap.add_argument("--kimi-latency", type=float, default=0.3, help="fake Chutes time to first byte (s)")
+    ap.add_argument("--token-delay", type=float, default=0.005, help="fake Chutes delay between stream chunks (s)")
+    ap.add_argument("--kimi-concurrency", type=int, default=4)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--garbage-rate", type=float, default=0.0)
+    ap.add_argument("--x-latency", type=float, default=0.02, help="fake twikit per-request latency (s)")
+    ap.add_argument("--scrape-rate", type=float, default=6000, help="SCRAPE_RATE_PER_MIN for the run")
+    ap.add_argument("--send-delay", type=float, default=0.05, help="fake Discord send/edit latency (s)")
+    ap.add_argument("--cache", action="store_true", help="leave the LLM cache on (off by default)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", help="write the result rows to this file")
+    ap.add_argument("-v", "--verbose", action="store_true", help="also print the metrics summary")
+    return ap.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    rows = asyncio.run(main(args))
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2))
+        print(f"💾 wrote {args.json}")
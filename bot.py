@@ -1,5 +1,4 @@
 import os
-import subprocess
 import pathlib
 
 import discord
@@ -8,39 +7,179 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # --- summarizer helpers ---
-from typing import List, Dict, Tuple
+from typing import Any, Callable, List, Dict, Tuple
 
-import aiohttp
+import hashlib
+import json
 import re
+import time
+
+from chutes_client import ChutesClient, CircuitBreaker, CHUTES_URL
+from llm_cache import LLMCache, cache_key
+from tokens import estimate_tokens, chunk_conversation
+from discord_sender import ChannelSender, MessagePacker, pack_code_blocks, split_text
+from metrics import REGISTRY, timed, summary_lines, serve_metrics
+from jobs import Job, JobQueue, PRIORITY_INTERACTIVE, PRIORITY_NEWS, PRIORITY_DIGEST
+from news_coalescer import NewsCoalescer, content_fingerprint
+from channel_resolver import ChannelResolver
+from subnet_registry import SubnetRegistry, Subnet, SUBNETS_FILE, SUBNET_TOKEN, convo_text
+from story_dedup import Story, split_shared_stories
+from prompt_budget import Compacted, compact_posts, compact_texts
+from relevance import select_relevant
+from attachments import AttachmentReader
+from posts import Post
+from kols import KOL_HANDLES
+from links import HostIndex, LinkExpander, SHORTENERS, order_links
+
+def record_kimi_usage(usage: dict) -> None:
+    tokens = REGISTRY.counter("kimi_tokens_total", "Tokens reported in Chutes `usage`")
+    tokens.inc(usage.get("prompt_tokens") or 0, kind="prompt")
+    tokens.inc(usage.get("completion_tokens") or 0, kind="completion")
+
+def record_discord_send(total: float, call: float, ok: bool) -> None:
+    REGISTRY.histogram("discord_send_seconds", "channel.send call latency").observe(call, kind="queued_send")
+    REGISTRY.histogram("discord_send_queue_seconds", "Enqueue to sent latency").observe(total)
+    REGISTRY.counter("discord_sends_total", "Messages sent").inc(outcome="ok" if ok else "error")
+
+def record_job(job: Job) -> None:
+    REGISTRY.counter("jobs_total", "Background jobs by final status").inc(kind=job.kind, status=job.status)
+    if job.started_at is not None:
+        REGISTRY.histogram("job_wait_seconds", "Job time spent queued").observe(job.started_at - job.created_at, kind=job.kind)
+        REGISTRY.histogram("job_run_seconds", "Job run time").observe(job.finished_at - job.started_at, kind=job.kind)
+
+def record_compaction(kind: str, c: Compacted) -> None:
+    REGISTRY.counter("prompt_input_tokens_total", "Estimated prompt input tokens after compaction").inc(c.tokens_out, kind=kind)
+    REGISTRY.counter("prompt_tokens_saved_total", "Estimated tokens removed by prompt compaction").inc(c.saved, kind=kind)
+
+# one pooled client for every summarize_* helper (closed in AssistantBot.close)
+kimi = ChutesClient(
+    url=os.getenv("CHUTES_URL", CHUTES_URL),  # point at a local fake server for testing
+    max_concurrency=int(os.getenv("CHUTES_MAX_CONCURRENCY", "4")),
+    connect_timeout=float(os.getenv("CHUTES_CONNECT_TIMEOUT", "10")),
+    read_timeout=float(os.getenv("CHUTES_READ_TIMEOUT", "120")),
+    max_retries=int(os.getenv("CHUTES_MAX_RETRIES", "3")),
+    hedge=os.getenv("CHUTES_HEDGE", "0") == "1",
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("CHUTES_BREAKER_FAILURES", "5")),
+        cooldown=float(os.getenv("CHUTES_BREAKER_COOLDOWN", "30")),
+    ),
+    on_usage=record_kimi_usage,
+)
 
-async def summarize_with_kimi(prompt: str, max_tokens: int = 400):
-    url = "https://llm.chutes.ai/v1/chat/completions"
-    api_token = os.getenv("CHUTES_API_TOKEN")
+# persistent response cache: same model + prompt + max_tokens -> no second Kimi call
+llm_cache = LLMCache(
+    os.path.join(os.path.dirname(__file__), "llm_cache.sqlite3"),
+    ttl_seconds=float(os.getenv("LLM_CACHE_TTL_HOURS", "24")) * 3600,
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000")),
+)
 
-    headers = {
-        "Authorization": f"Bearer {api_token}",
-        "Content-Type": "application/json"
-    }
+# outbound Discord queue: packs long output, paces sends per channel (closed in AssistantBot.close)
+sender = ChannelSender(on_sent=record_discord_send)
+DIGEST_USE_EMBEDS = os.getenv("DIGEST_USE_EMBEDS", "0") == "1"
 
-    body = {
-        "model": "moonshotai/Kimi-K2-Instruct-75k",
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": max_tokens,
-        "temperature": 0.3,
-        "stream": False
-    }
+# background LLM jobs: handlers only enqueue; workers run TLDRs > news > digest (closed in AssistantBot.close)
+job_queue = JobQueue(
+    workers=int(os.getenv("JOB_WORKERS", "3")),
+    reserved=int(os.getenv("JOB_RESERVED_INTERACTIVE", "1")),  # workers kept free for subnet TLDRs
+    on_finished=record_job,
+)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=headers, json=body) as response:
-            result = await response.json()
-            return result["choices"][0]["message"]["content"]
+async def summarize_with_kimi(prompt: str, max_tokens: int = 400, parse: Callable[[str], Any] | None = None):
+    """
+    Kimi's (cached) answer to `prompt`. With `parse`, returns parse(answer)
+    instead, and the answer is only cached when that is not None, so an
+    unusable reply is asked again next time rather than replayed.
+    """
+    requests = REGISTRY.counter("kimi_requests_total", "summarize_with_kimi calls by outcome")
+    key = cache_key(kimi.model, prompt, max_tokens)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        requests.inc(outcome="cache_hit")
+        return cached if parse is None else parse(cached)
+    try:
+        with timed("kimi_request_seconds", "Kimi completion latency", mode="complete"):
+            summary = await kimi.complete(prompt, max_tokens=max_tokens)
+    except Exception:
+        requests.inc(outcome="error")
+        raise
+    requests.inc(outcome="ok")
+    result = summary if parse is None else parse(summary)
+    if (summary or "").strip() and result is not None:
+        llm_cache.put(key, summary)
+    return result
+
+
+# --- streaming: post a placeholder, then edit it as tokens arrive ---
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.5"))  # Discord allows ~5 edits / 5s
+DISCORD_MSG_LIMIT = 2000
+
+async def stream_summary_to(channel, prompt: str, max_tokens: int, header: str, msg=None) -> Tuple[str, bool]:
+    """
+    Stream a Kimi completion into `channel`: send `header` + a placeholder
+    (or reuse `msg`, one already posted), then edit that message at most
+    once per STREAM_EDIT_INTERVAL while text arrives. Cached prompts are
+    posted directly. Returns (final text, ok); on a Kimi error the text
+    ends with the error note and ok is False.
+    """
+    key = cache_key(kimi.model, prompt, max_tokens)
+    requests = REGISTRY.counter("kimi_requests_total", "summarize_with_kimi calls by outcome")
+    cached = llm_cache.get(key)
+    if cached is not None:
+        requests.inc(outcome="cache_hit")
+        if msg is None:
+            await sender.send_sections(channel, [f"{header}\n{cached}"])
+        else:
+            first, *rest = split_text(f"{header}\n{cached}", DISCORD_MSG_LIMIT)
+            await msg.edit(content=first)
+            for piece in rest:
+                await sender.send(channel, piece)
+        return cached, True
+
+    if msg is None:
+        with timed("discord_send_seconds", kind="placeholder"):
+            msg = await channel.send(f"{header}\n⏳ thinking…")
+    text = ""
+    started = last_edit = time.monotonic()
+    try:
+        async for delta in kimi.stream(prompt, max_tokens=max_tokens):
+            if not text:
+                REGISTRY.histogram("kimi_first_token_seconds", "Time to first streamed token").observe(
+                    time.monotonic() - started
+                )
+            text += delta
+            now = time.monotonic()
+            if now - last_edit >= STREAM_EDIT_INTERVAL:
+                with timed("discord_send_seconds", kind="edit"):
+                    await msg.edit(content=f"{header}\n{text} ▌"[:DISCORD_MSG_LIMIT])
+                last_edit = now
+        REGISTRY.histogram("kimi_request_seconds", "Kimi completion latency").observe(time.monotonic() - started, mode="stream")
+        requests.inc(outcome="ok")
+    except Exception as e:
+        requests.inc(outcome="error")
+        text = (text + "\n" if text else "") + f"(Kimi error: {e!r})"
+        await msg.edit(content=f"{header}\n{text}"[:DISCORD_MSG_LIMIT])
+        return text, False
 
+    if text.strip():  # an empty completion is not an answer worth replaying
+        llm_cache.put(key, text)
+    # final text: first piece replaces the placeholder, any overflow follows as new messages
+    first, *rest = split_text(f"{header}\n{text}", DISCORD_MSG_LIMIT)
+    await msg.edit(content=first)
+    for piece in rest:
+        await sender.send(channel, piece)
+    return text, True
 
 
 # --- run the X scraper once (before digest) ---
-async def run_scraper_once():
-    proc = await asyncio.create_subprocess_exec(SCRAPER_EXE, SCRAPER_SCRIPT)
-    await proc.wait()
+async def run_scraper_once() -> Dict[str, int]:
+    """
+    Run the twikit scraper in-process and return {handle: new posts stored}.
+    SCRAPER_IN_WORKER=1 runs it on its own loop in a worker thread instead.
+    """
+    with timed("scrape_seconds", "Scraper run wall time"):
+        if SCRAPER_IN_WORKER:
+            return await asyncio.to_thread(lambda: asyncio.run(scraper_twikit.run_once()))
+        return await scraper_twikit.run_once()
 
 # ---- Investor POV wrapper for subnets ----
 def build_investor_prompt(subnet_name: str, raw_text: str) -> str:
@@ -76,49 +215,208 @@ async def summarize_subnet_with_kimi(subnet_name: str, raw_text: str, max_tokens
     prompt = build_investor_prompt(subnet_name, raw_text)
     return await summarize_with_kimi(prompt, max_tokens=max_tokens)
 
+# --- map-reduce for oversized subnet pastes ---
+# pastes above SUBNET_CHUNK_TOKENS are split on message boundaries, each chunk is
+# summarized concurrently, and one reduce pass turns the notes into the investor format
+SUBNET_CHUNK_TOKENS = int(os.getenv("SUBNET_CHUNK_TOKENS", "12000"))
+SUBNET_MAP_MAX_TOKENS = int(os.getenv("SUBNET_MAP_MAX_TOKENS", "300"))
+
+async def build_subnet_prompt(subnet_name: str, raw_text: str, on_map=None) -> str:
+    """
+    Return the final investor prompt for a paste. Small pastes go straight
+    into build_investor_prompt; large ones are mapped chunk-by-chunk first and
+    the returned prompt is the reduce pass over those partial summaries.
+    Parts whose map call failed are left out; if every part failed, the
+    first error is raised. `on_map(n_chunks)` is awaited before the map
+    phase starts.
+    """
+    if estimate_tokens(raw_text) <= SUBNET_CHUNK_TOKENS:
+        return build_investor_prompt(subnet_name, raw_text)
+
+    chunks = chunk_conversation(raw_text, SUBNET_CHUNK_TOKENS)
+    print(f"📚 {subnet_name}: {estimate_tokens(raw_text)} tokens → {len(chunks)} chunks")
+    if on_map is not None:
+        await on_map(len(chunks))
+    partials = await asyncio.gather(
+        *(
+            summarize_subnet_with_kimi(f"{subnet_name} (part {i}/{len(chunks)})", chunk, SUBNET_MAP_MAX_TOKENS)
+            for i, chunk in enumerate(chunks, 1)
+        ),
+        return_exceptions=True,
+    )
+    failed = [p for p in partials if isinstance(p, BaseException)]
+    if len(failed) == len(partials):
+        raise failed[0]
+    if failed:
+        print(f"⚠️ {subnet_name}: {len(failed)}/{len(chunks)} parts failed to summarize, reducing the rest")
+    notes = "\n\n".join(
+        f"[Part {i}/{len(chunks)} notes]\n{p.strip()}"
+        for i, p in enumerate(partials, 1)
+        if not isinstance(p, BaseException)
+    )
+    # reduce: same investor format, fed with the per-part notes in order
+    return build_investor_prompt(
+        f"{subnet_name} (condensed from {len(chunks)} consecutive parts of one long conversation)",
+        notes,
+    )
+
 # --- KOL helpers reusing the SAME investor prompt ---
 
-def join_kol_posts(posts: List[Dict]) -> str:
-    """Flatten KOL posts into a single text blob for Kimi."""
-    parts: List[str] = []
-    for p in posts:
-        t = (p.get("text") or "").strip()
-        if t:
-            parts.append(t)
-    # safety cap to avoid huge inputs; adjust as you like
-    return "\n\n".join(parts)
-
-async def summarize_kol_with_kimi(handle: str, posts: List[Dict], max_tokens: int = 400) -> str:
+KOL_MAX_INPUT_TOKENS = int(os.getenv("KOL_MAX_INPUT_TOKENS", "2000"))  # per handle, after cleanup; 0 = no cap
+
+def compact_kol_posts(posts: List[Post]) -> Compacted:
+    return compact_posts(posts, KOL_MAX_INPUT_TOKENS)
+
+def join_kol_posts(posts: List[Post]) -> str:
+    """Flatten KOL posts into a single text blob for Kimi, cleaned and capped at KOL_MAX_INPUT_TOKENS."""
+    return compact_kol_posts(posts).text
+
+async def summarize_kol_with_kimi(handle: str, posts: List[Post], max_tokens: int = 400) -> str:
     """
     Summarize a KOL's last 24h using the SAME investor POV prompt.
     """
-    raw_text = join_kol_posts(posts)
+    compacted = compact_kol_posts(posts)
+    record_compaction("kol", compacted)
+    raw_text = compacted.text
     # reuse your investor prompt; just label the source for context
     prompt = build_investor_prompt(f"@{handle} (KOL feed)", raw_text)
     return await summarize_with_kimi(prompt, max_tokens=max_tokens)
 
+# --- batched digest: several KOLs per Kimi call, JSON out ---
+KOL_BATCH_TOKENS = int(os.getenv("KOL_BATCH_TOKENS", "6000"))  # prompt budget per batch; 0 = one call per handle
+KOL_BATCH_TOKENS_PER_HANDLE = 250  # completion budget per handle in a batch
+
+def build_batched_kol_prompt(texts_by_handle: Dict[str, str]) -> str:
+    """One investor-POV prompt covering several KOL feeds, answered as JSON keyed by handle."""
+    blocks = "\n\n".join(
+        f"### @{handle}\n\"\"\"{text.strip()}\"\"\"" for handle, text in texts_by_handle.items()
+    )
+    example = ", ".join(f'"{h}": "..."' for h in texts_by_handle)
+    return f"""
+You are my assistant helping me as a **Bittensor miner, DTao investor, and subnet sentiment analyst**.
+Below are the last 24h of X posts from several KOLs, one block per handle.
+
+For EACH handle, write a tight investor-grade summary (2–3 crisp sentences):
+- key signals, news, or hidden alpha that could move markets
+- sentiment & mood, risks and opportunities
+- end with a 1-line investor take
+
+Return ONLY a JSON object mapping each handle (without @) to its summary string,
+with every handle below present, like: {{{example}}}
+
+{blocks}
+"""
+
+
+def parse_batched_summaries(text: str, handles: List[str]) -> Dict[str, str] | None:
+    """Parse Kimi's JSON answer back into {handle: summary}; None if unusable."""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    by_lower = {str(k).lstrip("@").lower(): v for k, v in data.items()}
+    out: Dict[str, str] = {}
+    for h in handles:
+        v = by_lower.get(h.lower())
+        if isinstance(v, str) and v.strip():
+            out[h] = v.strip()
+    return out or None
+
+
+def pack_kol_batches(posts_by_handle: Dict[str, List[Post]], budget: int) -> List[List[str]]:
+    """Group handles (in order) into batches whose joined posts fit `budget` tokens."""
+    batches: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for handle, posts in posts_by_handle.items():
+        cost = estimate_tokens(join_kol_posts(posts)) + 10  # + per-block framing
+        if current and used + cost > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(handle)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def summarize_kol_batch(posts_by_handle: Dict[str, List[Post]]) -> Dict[str, str]:
+    """
+    Summarize several KOLs in one call. Handles missing from (or the whole of)
+    an unparseable answer fall back to per-handle summarize_kol_with_kimi.
+    """
+    handles = list(posts_by_handle)
+    if len(handles) == 1:
+        h = handles[0]
+        return {h: await summarize_kol_with_kimi(h, posts_by_handle[h])}
+
+    compacted = {h: compact_kol_posts(p) for h, p in posts_by_handle.items()}
+    for c in compacted.values():
+        record_compaction("kol", c)
+    prompt = build_batched_kol_prompt({h: c.text for h, c in compacted.items()})
+    max_tokens = min(4000, 50 + KOL_BATCH_TOKENS_PER_HANDLE * len(handles))
+    try:
+        parsed = await summarize_with_kimi(
+            prompt, max_tokens=max_tokens, parse=lambda text: parse_batched_summaries(text, handles)
+        )
+    except Exception as e:
+        print(f"⚠️ batched KOL call failed ({e!r}); falling back per handle")
+        parsed = None
+    out = dict(parsed or {})
+    missing = [h for h in handles if h not in out]
+    if missing:
+        print(f"↩️ per-handle fallback for: {', '.join(missing)}")
+        results = await asyncio.gather(
+            *(summarize_kol_with_kimi(h, posts_by_handle[h]) for h in missing), return_exceptions=True
+        )
+        for h, r in zip(missing, results):
+            out[h] = f"(Kimi error: {r!r})" if isinstance(r, BaseException) else r
+    return out
+
 # --- daily digest at 8:00 ET ---
 import datetime
 from zoneinfo import ZoneInfo
 from discord.ext import tasks
 
-# --- scraper runner (uses .scrape311) ---
+# --- scraper runner (in-process twikit engine) ---
 import asyncio, os
+import scraper_twikit
+from post_store import default_store
 BASE_DIR = os.path.dirname(__file__)
-SCRAPER_EXE = os.path.join(BASE_DIR, ".scrape311", "Scripts", "python.exe")
-SCRAPER_SCRIPT = os.path.join(BASE_DIR, "scraper_twikit.py")
+SCRAPER_IN_WORKER = os.getenv("SCRAPER_IN_WORKER", "0") == "1"
 
 
 DISCORD_DIGEST_CHANNEL_ID = int(os.getenv("DISCORD_CHANNEL_ID", "EX_CHANNEL_ID"))
 KOLS_CHANNEL_ID = int(os.getenv("KOLS_CHANNEL_ID", "EX_CHANNEL_ID"))  # output for KOL summaries
 NEWS_UPDATES_CHANNEL_ID = int(os.getenv("NEWS_UPDATES_CHANNEL_ID", "0"))
+MY_USER_ID = int(os.getenv("MY_USER_ID", "0"))  # only this user can route subnet TLDRs
+CURATION_CHANNEL_ID = int(os.getenv("CURATION_CHANNEL_ID", "0"))  # #bittensor-curation
 
+# digest fan-out: how many KOL summaries run at once, and how long one may take
+KOL_SUMMARY_CONCURRENCY = int(os.getenv("KOL_SUMMARY_CONCURRENCY", "6"))
+KOL_SUMMARY_TIMEOUT = float(os.getenv("KOL_SUMMARY_TIMEOUT", "90"))
 
+# pre-compute: scrape + summarize DIGEST_LEAD_MINUTES before 8:00 so posting is a quick top-up
+DIGEST_AT = datetime.time(hour=8, minute=0, tzinfo=ZoneInfo("America/New_York"))
+DIGEST_LEAD_MINUTES = int(os.getenv("DIGEST_LEAD_MINUTES", "30"))  # 0 = no pre-compute
+DIGEST_ARTIFACT_MAX_AGE = float(os.getenv("DIGEST_ARTIFACT_MAX_AGE_MINUTES", "180")) * 60
+PRECOMPUTE_AT = (
+    datetime.datetime.combine(datetime.date(2000, 1, 2), DIGEST_AT) - datetime.timedelta(minutes=DIGEST_LEAD_MINUTES)
+).timetz()
 
 
-@tasks.loop(time=datetime.time(hour=8, minute=0, tzinfo=ZoneInfo("America/New_York")))
+@tasks.loop(time=DIGEST_AT)
 async def daily_digest():
-    await daily_kol_summary()  # scraper + Kimi + post to KOLS channel
+    submit_digest()  # scraper + Kimi + post to KOLS channel, as a background job
+
+@tasks.loop(time=PRECOMPUTE_AT)
+async def digest_precompute():
+    submit_precompute()
 
 
 # ---- intents setup ----
@@ -127,7 +425,27 @@ intents.guilds = True
 intents.message_content = True
 
 # ---- create the bot ----
-bot = commands.Bot(command_prefix="!", intents=intents)
+class AssistantBot(commands.Bot):
+    async def close(self):
+        news_coalescer.close()
+        await job_queue.close()
+        await kimi.close()  # drop pooled Chutes connections cleanly
+        await sender.close()
+        await attachment_reader.close()
+        await link_expander.close()
+        llm_cache.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await super().close()
+
+bot = AssistantBot(command_prefix="!", intents=intents)
+
+# destination channels: cached lookups (failures too), refreshed by channel events
+resolver = ChannelResolver(
+    bot,
+    ttl=float(os.getenv("CHANNEL_CACHE_TTL", "3600")),
+    negative_ttl=float(os.getenv("CHANNEL_NEGATIVE_TTL", "300")),
+)
 
 # ---- load token ----
 
@@ -135,6 +453,8 @@ TOKEN = os.getenv("DISCORD_TOKEN")
 
 # ---- any globals ----
 pending_confirmations = {}
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+metrics_runner = None
 
 
 # Mapping of subnet names to their corresponding channel IDs
@@ -149,26 +469,49 @@ SUBNET_CHANNELS = {
     "compute-horde-12": 1409977777777888999 #Channel_ID_EX
 }
 
+# every subnet by netuid/alias: SUBNET_CHANNELS + subnets.json (hot-reloaded) + channels created on demand
+subnet_registry = SubnetRegistry(path=os.getenv("SUBNETS_FILE", str(SUBNETS_FILE)), defaults=SUBNET_CHANNELS)
+SUBNET_CATEGORY_ID = int(os.getenv("SUBNET_CATEGORY_ID", "0"))  # category for auto-created subnet channels (0 = off)
+_subnet_channel_locks: Dict[int, asyncio.Lock] = {}
+
 # --- KOL config (order = output order at 8:00) ---
 # Add as many kols as you wish to this list also.
-KOL_HANDLES = [
-    "TAOTemplar", "JosephJacks_", "jaltucher", "KeithSingery", "SiamKidd", "markjeffrey",
-    "Taotreasuries", "here4impact", "SubnetStats", "mogmachine", "const_reborn", "shibshib89",
-    "Old_Samster", "bittingthembits", "badenglishtea", "learnbittensor", "Obsessedfan5",
-]
-
-ALLOWLIST = (
+ALLOWLIST = HostIndex((
     "youtube.com", "youtu.be", "github.com", "gitlab.com", "pypi.org",
     "docs.google.com", "drive.google.com", "readthedocs.io", "bittensor.com",
     "medium.com", "substack.com", "mirror.xyz"
+))
+
+# --- Links & Media: canonical URLs, short links expanded (cached on disk), each link listed once per digest ---
+LINK_EXPANSION = os.getenv("LINK_EXPANSION", "1") == "1"
+LINK_EXPAND_BUDGET = float(os.getenv("LINK_EXPAND_BUDGET", "10"))  # seconds a digest waits on uncached short links
+
+def record_link_expansion(outcome: str) -> None:
+    REGISTRY.counter("link_expansions_total", "Short links looked up for Links & Media").inc(outcome=outcome)
+
+link_expander = LinkExpander(
+    os.path.join(BASE_DIR, "link_cache.sqlite3"),
+    ttl_seconds=float(os.getenv("LINK_CACHE_TTL_DAYS", "30")) * 24 * 3600,
+    concurrency=int(os.getenv("LINK_EXPAND_CONCURRENCY", "8")),
+    timeout=float(os.getenv("LINK_EXPAND_TIMEOUT", "5")),
+    shorteners=SHORTENERS + tuple(h for h in os.getenv("LINK_SHORTENERS", "").split(",") if h.strip()),
+    on_result=record_link_expansion,
 )
 
+async def expand_digest_links(posts_by_handle: Dict[str, List[Post]]) -> Dict[str, str]:
+    """{short link: target} for every short link in the digest's posts ({} when LINK_EXPANSION=0)."""
+    if not LINK_EXPANSION:
+        return {}
+    return await link_expander.expand_all(
+        (u for posts in posts_by_handle.values() for p in posts for u in p.links), budget=LINK_EXPAND_BUDGET
+    )
+
 
 
-def summarize_handle_posts(handle: str, posts: List[Dict]) -> Tuple[str, List[str]]:
+def summarize_handle_posts(handle: str, posts: List[Post]) -> Tuple[str, List[str]]:
     """Return (one-paragraph summary, links_list)."""
     # keep originals + quote-tweets; drop replies/retweets (safer defaults)
-    items = [p for p in posts if not p.get("is_reply", False) and not p.get("is_retweet", False)]
+    items = [p for p in posts if not p.is_reply and not p.is_retweet]
     if not items:
         return "", []
 
@@ -179,103 +522,51 @@ def summarize_handle_posts(handle: str, posts: List[Dict]) -> Tuple[str, List[st
     sentences: List[str] = []
     links_all: List[str] = []
     for p in items:
-        txt = (p.get("text") or "").replace("\n", " ").strip()
+        txt = p.text.replace("\n", " ").strip()
         if txt:
             sentences.append(txt)
-        links_all.extend(p.get("links", []))
-        links_all.extend(p.get("media_urls", []))  # image/video URLs
+        links_all.extend(p.urls)  # text links, then image/video URLs
 
     # single paragraph under hard word cap (links/media not counted)
     words = " ".join(sentences).split()
     paragraph = " ".join(words[:cap])
 
-    # de-dupe + allowlist-first
-    seen = set()
-    safe: List[str] = []
-    other: List[str] = []
-    for url in links_all:
-        if not url or url in seen:
-            continue
-        seen.add(url)
-        (safe if any(dom in url.lower() for dom in ALLOWLIST) else other).append(url)
+    # canonical, de-duped, allowlist-first
+    return paragraph, order_links(links_all, ALLOWLIST)
 
-    return paragraph, (safe + other)
 
 
-
-def build_handle_section(handle: str, paragraph: str, links: List[str]) -> str:
+def build_handle_section(handle: str, paragraph: str, links: List[str], story_refs: List[str] = ()) -> str:
+    refs = f"🔁 Also posted shared stories: {', '.join(story_refs)} (see above)" if story_refs else ""
     # show a friendly note if the handle has no posts in the last 24h
     if not paragraph:
-        return f"**@{handle}**\n(nothing in the last 24h — touch grass 😎)"
+        return f"**@{handle}**\n{refs or '(nothing in the last 24h — touch grass 😎)'}"
     section = f"**@{handle}**\n{paragraph}"
+    if refs:
+        section += "\n" + refs
     if links:
         section += "\n\nLinks & Media:\n" + "\n".join(f"• {u}" for u in links)
     return section
 
 
 
-def get_posts_24h(handle: str) -> list[dict]:
+def get_posts_24h(handle: str) -> List[Post]:
     """
-    Read {handle}.jsonl from the project folder (snscrape output).
-    Return ONLY originals + quote-tweets from the last 24h.
-    If the file is missing or there are no items, return [].
+    Return ONLY originals + quote-tweets from the last 24h for `handle`:
+    one indexed query on the post store (posts.sqlite3).
+    If there are no items, return [].
     """
-    import os, json, datetime
-
-    path = os.path.join(os.path.dirname(__file__), f"{handle}.jsonl")
-    if not os.path.exists(path):
-        return []
+    import datetime
 
     now_utc = datetime.datetime.now(datetime.timezone.utc)
     since = now_utc - datetime.timedelta(hours=24)
-
-    def parse_iso(s: str):
-        try:
-            return datetime.datetime.fromisoformat(s.replace("Z", "+00:00"))
-        except Exception:
-            return None
-
-    posts: list[dict] = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                it = json.loads(line)
-            except Exception:
-                continue
-
-            d = parse_iso(str(it.get("date", "")))
-            if not d or d.tzinfo is None or d < since:
-                continue
-
-            # keep originals + quotes; drop replies/retweets
-            if it.get("retweetedTweet") is not None:
-                continue
-            if it.get("inReplyToTweetId") is not None:
-                continue
-            is_quote = it.get("quotedTweet") is not None
-
-            links = [u for u in (it.get("outlinks") or []) if isinstance(u, str)]
-            media_urls = []
-            for m in (it.get("media") or []):
-                if isinstance(m, dict):
-                    u = m.get("fullUrl") or m.get("thumbnailUrl") or m.get("url")
-                    if u:
-                        media_urls.append(u)
-
-            posts.append({
-                "text": it.get("content") or "",
-                "links": links,
-                "media_urls": media_urls,
-                "is_reply": False,
-                "is_retweet": False,
-                "is_quote": is_quote,
-            })
-
-    return posts
+    with timed("posts_read_seconds", "get_posts_24h latency"):
+        return default_store().posts_since(handle, since)
 
 
 
 def build_daily_sections() -> list[str]:
+    """Extractive (no-LLM) digest sections, one per handle; posted by !kol_raw."""
     sections = []
     for h in KOL_HANDLES:
         posts = get_posts_24h(h)
@@ -289,54 +580,24 @@ def build_daily_sections() -> list[str]:
 async def on_ready():
     print(f"✅ Ready: {bot.user} (id: {bot.user.id})")
     print(f"🔗 Connected guilds: {len(bot.guilds)}")
-    # start the 8:00 ET daily job
+    # start the 8:00 ET daily job (and its pre-compute)
     if not daily_digest.is_running():
         daily_digest.start()
+    if DIGEST_LEAD_MINUTES and not digest_precompute.is_running():
+        digest_precompute.start()
 
-
-
-    successes = 0
-    failures = 0
-
-    for subnet_name, channel_id in SUBNET_CHANNELS.items():
+    # local Prometheus-style endpoint (METRICS_PORT=0 disables)
+    global metrics_runner
+    if METRICS_PORT and metrics_runner is None:
         try:
-            channel_id = int(channel_id)
-        except ValueError:
-            print(f"❌ {subnet_name}: channel id is not a number -> {channel_id!r}")
-            failures += 1
-            continue
+            metrics_runner = await serve_metrics(METRICS_PORT)
+        except OSError as e:
+            print(f"⚠️ metrics endpoint not started ({e})")
 
-        channel = bot.get_channel(channel_id)
 
-        if channel is None:
-            try:
-                channel = await bot.fetch_channel(channel_id)
-            except discord.NotFound:
-                print(f"❌ {subnet_name}: ID {channel_id} not found")
-                failures += 1
-                continue
-            except discord.Forbidden:
-                print(f"❌ {subnet_name}: forbidden to view/send")
-                failures += 1
-                continue
-            except discord.HTTPException as e:
-                print(f"❌ {subnet_name}: HTTP error while fetching ({e})")
-                failures += 1
-                continue
-
-        if not hasattr(channel, "send"):
-            print(f"❌ {subnet_name}: destination isn’t a text channel/thread (type={type(channel).__name__})")
-            failures += 1
-            continue
-
-        try:
-            ch_name = getattr(channel, "name", str(channel_id))
-            print(f"✅ warmed {subnet_name} -> #{ch_name} ({channel_id})")
-            successes += 1
-        except Exception as e:
-            print(f"⚠️ {subnet_name}: warmed but couldn’t read name ({e})")
-            successes += 1
 
+    # resolve every destination at once so routing never waits on a REST lookup
+    successes, failures = await resolver.prewarm({"kols": KOLS_CHANNEL_ID, **subnet_registry.mapped()})
     print(f"📘 pre-warm summary: {successes} ok, {failures} failed")
 
 
@@ -344,53 +605,395 @@ async def on_ready():
 async def hello(ctx):
     await ctx.send("Hello! I'm alive 🚀")
 
-async def daily_kol_summary():
-    await run_scraper_once()
-    channel = bot.get_channel(KOLS_CHANNEL_ID) or await bot.fetch_channel(KOLS_CHANNEL_ID)
-    now_et = datetime.datetime.now(ZoneInfo("America/New_York"))
-    await channel.send(
-        f"☀️☕ GM TRENDSETTERS — {now_et:%a %b %d} — Time to get ahead of the curve, read below the latest Bittensor news!"
+def collect_kol_urls(posts: List[Post], expanded: Dict[str, str] | None = None, seen: set | None = None) -> List[str]:
+    """
+    Links & Media for the scraped posts (text links + media): canonical,
+    short links expanded, allowlist first. With `seen` shared across a
+    digest, a link already listed in an earlier section is left out.
+    """
+    return order_links((u for p in posts for u in p.urls), ALLOWLIST, expanded, seen)
+
+
+async def summarize_kols_concurrently(posts_by_handle: Dict[str, List[Post]]) -> Dict[str, "asyncio.Task[str]"]:
+    """
+    Stage 1 of the digest: start every Kimi summary at once (at most
+    KOL_SUMMARY_CONCURRENCY calls in flight). Handles are packed into
+    batched calls of up to KOL_BATCH_TOKENS prompt tokens. Each per-handle
+    task resolves to the summary text or an inline error, so one bad handle
+    never raises.
+    """
+    sem = asyncio.Semaphore(KOL_SUMMARY_CONCURRENCY)
+
+    async def one_batch(batch: List[str]) -> Dict[str, str]:
+        async with sem:
+            try:
+                return await asyncio.wait_for(
+                    summarize_kol_batch({h: posts_by_handle[h] for h in batch}),
+                    timeout=KOL_SUMMARY_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                return {h: f"(Kimi timed out after {KOL_SUMMARY_TIMEOUT:.0f}s)" for h in batch}
+            except Exception as e:
+                return {h: f"(Kimi error: {e!r})" for h in batch}
+
+    async def pick(batch_task: "asyncio.Task[Dict[str, str]]", handle: str) -> str:
+        return (await batch_task).get(handle, "(Kimi returned nothing)")
+
+    if KOL_BATCH_TOKENS > 0:
+        batches = pack_kol_batches(posts_by_handle, KOL_BATCH_TOKENS)
+    else:
+        batches = [[h] for h in posts_by_handle]
+    tasks_by_handle: Dict[str, "asyncio.Task[str]"] = {}
+    for batch in batches:
+        batch_task = asyncio.create_task(one_batch(batch))
+        for h in batch:
+            tasks_by_handle[h] = asyncio.create_task(pick(batch_task, h))
+    return tasks_by_handle
+
+
+# --- shared stories: posts several KOLs made about the same thing, summarized once ---
+STORY_DEDUP = os.getenv("STORY_DEDUP", "1") == "1"
+STORY_SIMILARITY = float(os.getenv("STORY_SIMILARITY", "0.5"))  # shingle Jaccard to count as the same story
+STORY_MIN_HANDLES = int(os.getenv("STORY_MIN_HANDLES", "2"))
+
+def dedup_stories(posts_by_handle: Dict[str, List[Post]]) -> Tuple[List[Story], Dict[str, List[Post]], Dict[str, List[Story]]]:
+    """(stories, own_posts, stories_by_handle); own_posts drops each handle's posts that belong to a story."""
+    if not STORY_DEDUP:
+        return [], posts_by_handle, {}
+    stories, own_posts, by_handle = split_shared_stories(
+        posts_by_handle, threshold=STORY_SIMILARITY, min_handles=STORY_MIN_HANDLES
+    )
+    if stories:
+        folded = sum(len(s.posts) for s in stories)
+        REGISTRY.counter("digest_story_posts_total", "KOL posts folded into shared stories").inc(folded)
+        print(f"🔁 {len(stories)} shared stories cover {folded} posts from {len(by_handle)} handles")
+    return stories, own_posts, by_handle
+
+def story_text(story: Story) -> str:
+    return compact_texts(story.texts(), KOL_MAX_INPUT_TOKENS).text
+
+def build_story_prompt(stories: List[Story]) -> str:
+    """Batched investor-POV prompt for shared stories, answered as JSON keyed by story label."""
+    blocks = "\n\n".join(
+        f"### {s.label} (posted by {', '.join('@' + h for h in s.handles)})\n\"\"\"{story_text(s)}\"\"\"" for s in stories
     )
+    example = ", ".join(f'"{s.label}": "..."' for s in stories)
+    return f"""
+You are my assistant helping me as a **Bittensor miner, DTao investor, and subnet sentiment analyst**.
+Each block below is ONE story that several KOLs posted about in the last 24h.
+
+For EACH story, write a tight investor-grade summary (1–2 crisp sentences):
+what happened, why it matters for TAO / subnets, and how strongly KOLs are pushing it.
+
+Return ONLY a JSON object mapping each story label to its summary string,
+with every label below present, like: {{{example}}}
+
+{blocks}
+"""
+
+async def summarize_stories(stories: List[Story], reused: Dict[str, str] | None = None) -> Dict[str, str]:
+    """
+    {story.key: summary}, one Kimi call per KOL_BATCH_TOKENS of stories;
+    stories in `reused` (keyed the same way) are not sent again.
+    """
+    out = {s.key: reused[s.key] for s in stories if reused and s.key in reused}
+    todo = [s for s in stories if s.key not in out]
+    batches: List[List[Story]] = []
+    used = 0
+    for s in todo:
+        cost = estimate_tokens(story_text(s)) + 20
+        if not batches or (KOL_BATCH_TOKENS > 0 and used + cost > KOL_BATCH_TOKENS):
+            batches.append([])
+            used = 0
+        batches[-1].append(s)
+        used += cost
+    sem = asyncio.Semaphore(KOL_SUMMARY_CONCURRENCY)
+
+    async def one_batch(batch: List[Story]) -> None:
+        async with sem:
+            try:
+                parsed = await asyncio.wait_for(
+                    summarize_with_kimi(
+                        build_story_prompt(batch),
+                        max_tokens=min(4000, 50 + 150 * len(batch)),
+                        parse=lambda text: parse_batched_summaries(text, [s.label for s in batch]),
+                    ),
+                    timeout=KOL_SUMMARY_TIMEOUT,
+                ) or {}
+            except Exception as e:
+                print(f"⚠️ shared-story call failed ({e!r})")
+                parsed = {}
+        for s in batch:
+            # unparsed stories still get a line: the longest copy, trimmed (never saved for reuse)
+            out[s.key] = parsed.get(s.label) or "(Kimi unavailable) " + " ".join(story_text(s).split()[:60])
+
+    await asyncio.gather(*(one_batch(b) for b in batches))
+    return out
+
+def build_story_section(story: Story, summary: str, links: List[str]) -> str:
+    section = f"**🔁 {story.label} — shared by {', '.join('@' + h for h in story.handles)}**\n{summary}"
+    if links:
+        section += "\n\nLinks & Media:\n" + "\n".join(f"• {u}" for u in links)
+    return section
+
+
+DIGEST_RUNS_FILE = os.path.join(BASE_DIR, "digest_runs.jsonl")
+
+def write_run_summary(timings: Dict[str, float], **extra) -> None:
+    """Print one digest run's stage timings and append them to digest_runs.jsonl."""
+    for stage, seconds in timings.items():
+        REGISTRY.histogram("digest_stage_seconds", "Daily digest stage wall time").observe(seconds, stage=stage)
+    row = {"at": datetime.datetime.now(datetime.timezone.utc).isoformat(), **{k: round(v, 3) for k, v in timings.items()}, **extra}
+    print("⏱️ digest run: " + ", ".join(f"{k}={v:.1f}s" for k, v in timings.items()))
+    try:
+        with open(DIGEST_RUNS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"⚠️ couldn’t write run summary ({e})")
+
+
+DIGEST_ARTIFACT_FILE = os.path.join(BASE_DIR, "digest_artifact.json")
+
+def post_key(post: Post) -> str:
+    raw = post.text + "\n" + "\n".join(post.links)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def save_digest_artifact(
+    posts_by_handle: Dict[str, List[Post]], summaries: Dict[str, str], story_summaries: Dict[str, str] | None = None
+) -> None:
+    """Store ready-to-post summaries plus the posts they cover (digest_artifact.json)."""
+    artifact = {
+        "built_at": time.time(),
+        "handles": {
+            h: {"summary": summaries[h], "posts": [post_key(p) for p in posts]}
+            for h, posts in posts_by_handle.items()
+            if h in summaries and not summaries[h].startswith("(Kimi")  # never reuse an error
+        },
+        # story.key changes whenever its posts do
+        "stories": {k: v for k, v in (story_summaries or {}).items() if not v.startswith("(Kimi")},
+    }
+    tmp = DIGEST_ARTIFACT_FILE + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(artifact, f, ensure_ascii=False)
+        os.replace(tmp, DIGEST_ARTIFACT_FILE)
+    except OSError as e:
+        print(f"⚠️ couldn’t save digest artifact ({e})")
+
+def load_digest_artifact(max_age: float = DIGEST_ARTIFACT_MAX_AGE) -> Dict | None:
+    try:
+        with open(DIGEST_ARTIFACT_FILE, "r", encoding="utf-8") as f:
+            artifact = json.load(f)
+    except (OSError, ValueError):
+        return None
+    age = time.time() - float(artifact.get("built_at") or 0)
+    if age > max_age:
+        print(f"🗑️ digest artifact is {age / 60:.0f} min old; rebuilding")
+        return None
+    return artifact
+
+def reusable_summaries(posts_by_handle: Dict[str, List[Post]], artifact: Dict | None) -> Dict[str, str]:
+    """Stored summaries for handles with no posts newer than the artifact (the rest need a top-up)."""
+    if not artifact:
+        return {}
+    out = {}
+    for h, posts in posts_by_handle.items():
+        entry = artifact["handles"].get(h)
+        if entry and {post_key(p) for p in posts} <= set(entry["posts"]):
+            out[h] = entry["summary"]
+    return out
+
+# --- relevance: only on-topic posts reach Kimi ---
+RELEVANCE_RANKING = os.getenv("RELEVANCE_RANKING", "1") == "1"
+RELEVANCE_TOP_K = int(os.getenv("RELEVANCE_TOP_K", "12"))  # posts kept per handle; 0 = no limit
+RELEVANCE_MIN_SCORE = float(os.getenv("RELEVANCE_MIN_SCORE", "0"))  # Bittensor-term TF-IDF / log2 length; 0 = any mention
+RELEVANCE_EXTRA_TERMS = [t for t in os.getenv("RELEVANCE_EXTRA_TERMS", "").split(",") if t.strip()]
+
+def rank_digest_posts(posts_by_handle: Dict[str, List[Post]]) -> Dict[str, List[Post]]:
+    if not RELEVANCE_RANKING:
+        return posts_by_handle
+    kept, dropped = select_relevant(posts_by_handle, RELEVANCE_TOP_K, RELEVANCE_MIN_SCORE, RELEVANCE_EXTRA_TERMS)
+    if dropped:
+        REGISTRY.counter("digest_posts_filtered_total", "KOL posts left out as off-topic or past top-K").inc(dropped)
+        print(f"🎯 relevance: kept {sum(map(len, kept.values()))} posts, dropped {dropped}")
+    return kept
+
+async def collect_digest_posts(timings: Dict[str, float]) -> Dict[str, List[Post]]:
+    t = time.monotonic()
+    await run_scraper_once()
+    timings["scrape"] = time.monotonic() - t
+    # read every handle's window from the post store
+    t = time.monotonic()
+    posts_by_handle = {h: get_posts_24h(h) for h in KOL_HANDLES}
+    timings["read"] = time.monotonic() - t
+    t = time.monotonic()
+    posts_by_handle = rank_digest_posts(posts_by_handle)
+    timings["rank"] = time.monotonic() - t
+    return {h: p for h, p in posts_by_handle.items() if p}
+
+
+async def precompute_digest():
+    """Scrape and summarize every KOL ahead of DIGEST_AT; daily_kol_summary() then only tops up."""
+    t0 = time.monotonic()
+    timings: Dict[str, float] = {}
+    posts_by_handle = await collect_digest_posts(timings)
+    t = time.monotonic()
+    stories, own_posts, _ = await asyncio.to_thread(dedup_stories, posts_by_handle)
+    timings["dedup"] = time.monotonic() - t
+    t = time.monotonic()
+    story_task = asyncio.create_task(summarize_stories(stories))
+    links_task = asyncio.create_task(expand_digest_links(posts_by_handle))  # warms the link cache for the 8:00 post
+    tasks_by_handle = await summarize_kols_concurrently({h: p for h, p in own_posts.items() if p})
+    summaries = {h: await task for h, task in tasks_by_handle.items()}
+    story_summaries = await story_task
+    await links_task
+    timings["summarize"] = time.monotonic() - t
+    save_digest_artifact(own_posts, summaries, story_summaries)
+    timings["total"] = time.monotonic() - t0
+    write_run_summary(timings, kind="precompute", handles=len(posts_by_handle), stories=len(stories),
+                      posts=sum(len(p) for p in posts_by_handle.values()))
+
+
+async def daily_kol_summary():
+    # a pre-compute still running will have the freshest summaries: wait for it rather than duplicate it
+    if precompute_job is not None and precompute_job.active:
+        if precompute_job.status == "running":
+            print(f"⏳ waiting for digest pre-compute (job #{precompute_job.id})")
+            await precompute_job.finished.wait()
+        else:
+            job_queue.cancel(precompute_job.id, reason="digest started first")
+
+    t0 = time.monotonic()
+    timings: Dict[str, float] = {}
+    posts_by_handle = await collect_digest_posts(timings)
+
+    # stories several KOLs posted are summarized once, the rest per handle
+    t = time.monotonic()
+    stories, own_posts, stories_by_handle = await asyncio.to_thread(dedup_stories, posts_by_handle)
+    timings["dedup"] = time.monotonic() - t
+
+    # reuse pre-computed summaries; only handles with new posts go to Kimi
+    t = time.monotonic()
+    artifact = load_digest_artifact()
+    reused = reusable_summaries(own_posts, artifact)
+    to_summarize = {h: p for h, p in own_posts.items() if p and h not in reused}
+    if reused:
+        print(f"♻️ digest: {len(reused)} summaries from the pre-compute, {len(to_summarize)} to top up")
+    story_task = asyncio.create_task(summarize_stories(stories, (artifact or {}).get("stories")))
+    links_task = asyncio.create_task(expand_digest_links(posts_by_handle))
+    tasks_by_handle = await summarize_kols_concurrently(to_summarize)
+
+    channel = await resolver.resolve(KOLS_CHANNEL_ID)
     print("[kols] posting to:", KOLS_CHANNEL_ID, channel)
 
+    # Stage 2: build sections in KOL_HANDLES order as each summary becomes ready;
+    # full messages are queued right away, embeds are packed once at the end
+    sections = [digest_header()]
+    summaries: Dict[str, str] = {}
+    packer = MessagePacker()
+    pending = [] if DIGEST_USE_EMBEDS else [sender.enqueue(channel, m) for m in packer.add(sections[0])]
+    story_summaries = await story_task
+    expanded = await links_task
+    shown_links: set = set()  # each link is listed once, under the first section that has it
+    for story in stories:
+        section = build_story_section(story, story_summaries[story.key], collect_kol_urls(story.posts, expanded, shown_links))
+        sections.append(section)
+        if not DIGEST_USE_EMBEDS:
+            pending += [sender.enqueue(channel, m) for m in packer.add(section)]
     for handle in KOL_HANDLES:
-        posts = get_posts_24h(handle)
-        if not posts:
+        if handle not in posts_by_handle:
             continue
+        if handle in reused:
+            summary = reused[handle]
+        elif handle in tasks_by_handle:
+            summary = await tasks_by_handle[handle]
+        else:
+            summary = ""  # every post was part of a shared story
+        if summary:
+            summaries[handle] = summary
+        refs = [s.label for s in stories_by_handle.get(handle, [])]
+        section = build_handle_section(handle, summary, collect_kol_urls(own_posts[handle], expanded, shown_links), refs)
+        sections.append(section)
+        if not DIGEST_USE_EMBEDS:
+            pending += [sender.enqueue(channel, m) for m in packer.add(section)]
+    timings["summarize"] = time.monotonic() - t
+
+    t = time.monotonic()
+    if DIGEST_USE_EMBEDS:
+        await sender.send_sections(channel, sections, use_embeds=True)
+    else:
+        pending += [sender.enqueue(channel, m) for m in packer.flush()]
+        await asyncio.gather(*pending, return_exceptions=True)
+    timings["send_tail"] = time.monotonic() - t  # sends still queued after the last summary
+    timings["total"] = time.monotonic() - t0
+    st = sender.stats()
+    print(f"📨 digest sent: {st['sent']} msgs total, send latency p50={st['p50']:.2f}s p95={st['p95']:.2f}s")
+    if to_summarize or set(story_summaries) - set((artifact or {}).get("stories") or {}):
+        save_digest_artifact(own_posts, summaries, story_summaries)  # a later !kol_now reuses the top-up too
+    write_run_summary(timings, kind="post", handles=len(posts_by_handle), reused=len(reused), stories=len(stories),
+                      posts=sum(len(p) for p in posts_by_handle.values()))
+
+
+def digest_header() -> str:
+    now_et = datetime.datetime.now(ZoneInfo("America/New_York"))
+    return f"☀️☕ GM TRENDSETTERS — {now_et:%a %b %d} — Time to get ahead of the curve, read below the latest Bittensor news!"
 
-        # collect URLs from the scraped posts (text links + media)
-        urls = set()
-        for p in posts:
-            for u in (p.get("links") or []):
-                if u: urls.add(u)
-            # support both shapes: ["media_urls"] or [{"url":..., "thumbnail_url":...}]
-            for u in (p.get("media_urls") or []):
-                if u: urls.add(u)
-            for m in (p.get("media") or []):
-                u = (m or {}).get("url") or (m or {}).get("thumbnail_url")
-                if u: urls.add(u)
-        urls = sorted(urls)
 
-        try:
-            summary = await summarize_kol_with_kimi(handle, posts)  # Kimi summary from text
-        except Exception as e:
-            summary = f"(Kimi error: {e!r})"
+@bot.command(name="kol_raw")
+async def kol_raw(ctx):
+    """Post the extractive digest (no Kimi) straight from the post store."""
+    channel = await resolver.resolve(KOLS_CHANNEL_ID)
+    await sender.send_sections(channel, [digest_header()] + build_daily_sections(), use_embeds=DIGEST_USE_EMBEDS)
 
-        # post summary
-        await channel.send(f"**@{handle}**\n{summary}")
 
-        # post links/media list
-        if urls:
-            await channel.send("**Links & Media:**\n" + "\n".join(f"• {u}" for u in urls))
+@bot.command(name="cache_stats")
+async def cache_stats(ctx):
+    st = llm_cache.stats()
+    await ctx.send(
+        f"🗄️ LLM cache: {st['entries']} entries — {st['hits']} hits / {st['misses']} misses "
+        f"({st['hit_rate']:.0%} hit rate), {st['evictions']} evicted"
+    )
 
+@bot.command(name="stats")
+async def stats(ctx):
+    """Latency histograms and counters collected since startup."""
+    st = sender.stats()
+    lines = summary_lines() + [
+        f"sender: {st['sent']} sent / {st['failed']} failed, {st['queued']} queued",
+        f"chutes: breaker={kimi.breaker.state}, hedges fired={kimi.hedges_fired}",
+        "channels: {cached} cached, {failed} failed, {fetches} REST fetches".format(**resolver.stats()),
+        f"news: {news_coalescer.pending()} waiting in bursts, {news_coalescer.coalesced} coalesced, "
+        f"{news_coalescer.duplicates} duplicates skipped",
+    ]
+    await sender.send_sections(ctx.channel, pack_code_blocks("📊 **Stats**", lines))
+
+def submit_digest() -> Job:
+    # one digest at a time: a second trigger while one is queued/running is dropped
+    return job_queue.submit("digest", daily_kol_summary, priority=PRIORITY_DIGEST, key="digest")
+
+precompute_job: Job | None = None
+
+def submit_precompute() -> Job:
+    global precompute_job
+    precompute_job = job_queue.submit("digest_precompute", precompute_digest, priority=PRIORITY_DIGEST, key="digest_precompute")
+    return precompute_job
 
 @bot.command(name="kol_now")
 async def kol_now(ctx):
-    await ctx.send("Running KOL summary manually...")
-    await daily_kol_summary()
-
-async def handle_news_update(message: discord.Message):
-    # 1) Grab all readable text from the post (plain text + embed parts)
+    job = submit_digest()
+    await ctx.send(f"Running KOL summary manually... (job #{job.id}, {job.status})")
+
+@bot.command(name="jobs")
+async def jobs(ctx):
+    """Running, queued and recently finished background jobs."""
+    st = job_queue.stats()
+    queued = ", ".join(f"{k}={v}" for k, v in st["queued"].items() if v) or "none"
+    lines = [f"{st['running']}/{st['workers']} workers busy, queued: {queued}"]
+    lines += [j.describe() for j in job_queue.jobs()[:15]]
+    await sender.send_sections(ctx.channel, pack_code_blocks("🧵 **Jobs**", lines))
+
+def extract_news_content(message: discord.Message) -> Tuple[str, List[str]]:
+    """All readable text (content + embed parts) and every URL in one news message."""
     parts = []
     if message.content:
         parts.append(message.content)
@@ -402,7 +1005,6 @@ async def handle_news_update(message: discord.Message):
             if getattr(f, "value", None): parts.append(f.value)
     raw_text = "\n\n".join(p.strip() for p in parts if p)
 
-    # 2) Collect every URL we can find (text, attachments, embed links/images)
     links = set()
     links.update(re.findall(r"https?://\S+", raw_text))       # URLs in text
     for a in message.attachments or []:                        # files/images
@@ -411,8 +1013,53 @@ async def handle_news_update(message: discord.Message):
         if e.url: links.add(e.url)
         if getattr(e, "image", None) and e.image.url: links.add(e.image.url)
         if getattr(e, "thumbnail", None) and e.thumbnail.url: links.add(e.thumbnail.url)
+    return raw_text, sorted(links)
+
 
-    # 3) Build a concise prompt for Kimi
+NEWS_MAX_INPUT_TOKENS = int(os.getenv("NEWS_MAX_INPUT_TOKENS", "3000"))  # burst text after cleanup; 0 = no cap
+NEWS_MAX_LINKS = int(os.getenv("NEWS_MAX_LINKS", "15"))
+
+async def handle_news_burst(messages: List[discord.Message]):
+    """One Kimi summary for a burst of news messages, skipping content already summarized."""
+    # 1) Collect text + URLs per message; drop anything seen before (cross-posts, repeats).
+    # seen() also claims new content, so a concurrent cross-post is skipped; a failed summary forgets it below.
+    texts, links, fingerprints = [], set(), []
+    for message in messages:
+        raw_text, msg_links = extract_news_content(message)
+        if not raw_text and not msg_links:
+            continue
+        fp = content_fingerprint(raw_text, msg_links)
+        if news_coalescer.seen(fp):
+            REGISTRY.counter("news_messages_total", "News messages by outcome").inc(outcome="duplicate")
+            print(f"⏭️ news {message.id}: already summarized, skipped")
+            continue
+        fingerprints.append(fp)
+        texts.append(raw_text)
+        links.update(msg_links)
+    if not texts and not links:
+        return
+    ok = False
+    try:
+        ok = await summarize_news(messages[-1].channel, texts, links)
+    finally:
+        if not ok:  # error, open breaker or cancelled: the next copy of this announcement gets another try
+            news_coalescer.forget(fingerprints)
+
+
+async def summarize_news(channel, texts: List[str], links: set) -> bool:
+    """Compact a burst's texts, prompt Kimi and stream the summary into `channel`; True if it succeeded."""
+    REGISTRY.counter("news_messages_total", "News messages by outcome").inc(len(texts), outcome="summarized")
+    # line by line, so an embed repeating the message body is dropped; earlier messages win the budget
+    compacted = compact_texts([line for t in texts for line in t.splitlines()], NEWS_MAX_INPUT_TOKENS, sep="\n")
+    record_compaction("news", compacted)
+    raw_text = compacted.text
+    # URLs already quoted in the text aren't listed twice
+    links = [u for u in sorted(links) if u not in raw_text][:NEWS_MAX_LINKS]
+    if compacted.saved:
+        print(f"✂️ news prompt: {compacted.tokens_in} → {compacted.tokens_out} tokens "
+              f"({compacted.duplicates} repeated lines, {compacted.dropped} over budget)")
+
+    # 2) Build a concise prompt for Kimi
     prompt = f"""
 You are summarizing an official Bittensor announcement.
 
@@ -425,124 +1072,221 @@ Text:
 \"\"\"{raw_text.strip()}\"\"\"
 
 Links:
-{chr(10).join(sorted(links))}
+{chr(10).join(links)}
 """.strip()
 
-    # 4) Call Kimi and post the summary back into the same channel
-    try:
-        summary = await summarize_with_kimi(prompt, max_tokens=350)
-    except Exception as e:
-        summary = f"(Kimi error: {e!r})"
+    # 3) Stream Kimi's summary back into the same channel
+    _, ok = await stream_summary_to(channel, prompt, 350, "🧾 **Announcement summary**")
+    return ok
+
+
+def submit_news_burst(messages: List[discord.Message]) -> Job:
+    REGISTRY.counter("news_bursts_total", "Coalesced news bursts (one summary each)").inc()
+    return job_queue.submit("news", handle_news_burst, messages, priority=PRIORITY_NEWS, key=f"news:{messages[0].id}")
+
 
-    await message.channel.send(f"🧾 **Announcement summary**\n{summary}")
+# news watcher: bursts from one author/channel become one summary job
+news_coalescer = NewsCoalescer(
+    submit_news_burst,
+    window=float(os.getenv("NEWS_COALESCE_SECONDS", "8")),
+    max_wait=float(os.getenv("NEWS_COALESCE_MAX_SECONDS", "30")),
+    seen_ttl=float(os.getenv("NEWS_DEDUP_HOURS", "24")) * 3600,
+)
+
+
+async def subnet_destination(subnet: Subnet):
+    """The subnet's output channel; without a mapped one, find or create #name-netuid under SUBNET_CATEGORY_ID."""
+    if subnet.channel_id:
+        return await resolver.resolve(subnet.channel_id)
+    async with _subnet_channel_locks.setdefault(subnet.netuid, asyncio.Lock()):
+        current = subnet_registry.by_netuid(subnet.netuid) or subnet
+        if current.channel_id:  # created while we waited for the lock
+            return await resolver.resolve(current.channel_id)
+        category = await resolver.resolve(SUBNET_CATEGORY_ID, need="create_text_channel")
+        channel = discord.utils.get(category.text_channels, name=subnet.label)
+        if channel is None:
+            channel = await category.create_text_channel(subnet.label, reason=f"TLDRs for subnet {subnet.netuid}")
+            print(f"🆕 created #{channel.name} ({channel.id}) for subnet {subnet.netuid}")
+        subnet_registry.remember_channel(subnet.netuid, channel.id)
+        return channel
+
+async def route_subnet_summary(subnet: Subnet, source, cap: int | None, confirm_to=None):
+    # the paste is read here, in the job: attachments can be tens of MB and handlers only enqueue
+    raw_text, note = await read_convo_text(source)
+    if note:
+        await source.channel.send(note)
+    if not raw_text:
+        await source.channel.send("❌ I didn’t find any text to summarize (empty message / file).")
+        return
+    if cap is None:
+        n_words = len(raw_text.split())
+        cap = 50 if n_words <= 120 else (115 if n_words <= 400 else 145)
+    dest = await subnet_destination(subnet)
+    header = "🧾 Summary:"
+    placeholder = None
+
+    async def show_progress(parts: int) -> None:
+        # big pastes: something on screen before the map calls, the reduce pass streams into it
+        nonlocal placeholder
+        with timed("discord_send_seconds", kind="placeholder"):
+            placeholder = await dest.send(f"{header}\n⏳ summarizing {parts} parts…")
+
+    prompt = await build_subnet_prompt(subnet.label, raw_text, on_map=show_progress)
+    await stream_summary_to(dest, prompt, cap, header, msg=placeholder)
+    print(f"✅ Routed + summarized → {subnet.label} (max_tokens={cap})")
+    if confirm_to is not None:
+        await confirm_to.send(f"✅ Routed to `{subnet.label}` with summarized output.")
+
+def submit_subnet_summary(subnet: Subnet, source, cap: int | None = None, confirm_to=None) -> Job:
+    """Queue a TLDR of `source` (its attachments, else its text); cap=None sizes it by the paste's length."""
+    # the same message for the same subnet is only summarized once at a time
+    return job_queue.submit(
+        "subnet", route_subnet_summary, subnet, source, cap, confirm_to,
+        priority=PRIORITY_INTERACTIVE, key=f"subnet:{subnet.netuid}:{source.id}",
+    )
+
+# convo exports attached to a TLDR request: streamed, decoded and normalized with bounded memory
+attachment_reader = AttachmentReader(
+    max_bytes=int(os.getenv("ATTACHMENT_MAX_MB", "50")) * 1024 * 1024,
+    max_chars=int(os.getenv("ATTACHMENT_MAX_CHARS", "1000000")),
+)
+
+async def read_convo_text(message) -> Tuple[str, str]:
+    """
+    (text, note): every attached .txt/.gz/.zip export, else the message text
+    minus its subnet prefix; note is a warning for the user, or "".
+    """
+    raw_text, notes = "", []
+    if message.attachments:
+        ingested = await attachment_reader.ingest(message.attachments)
+        raw_text = ingested.text
+        REGISTRY.counter("attachment_bytes_total", "Attachment bytes downloaded").inc(ingested.bytes_read)
+        if ingested.files:
+            print(f"📎 read {', '.join(ingested.files)} ({ingested.bytes_read / 1024:.0f} KiB, {len(raw_text)} chars)")
+        if ingested.skipped:
+            notes.append("skipped " + "; ".join(ingested.skipped))
+        if ingested.truncated:
+            notes.append(f"export cut to the first {len(raw_text):,} characters")
+    if not raw_text:
+        raw_text = convo_text(message.content)
+    return raw_text, ("⚠️ " + " — ".join(notes)) if notes else ""
+
+def subnet_not_routable(subnet: Subnet) -> str | None:
+    if subnet.channel_id or SUBNET_CATEGORY_ID:
+        return None
+    return (f"❌ `{subnet.label}` has no output channel yet. Add its channel_id to subnets.json "
+            f"(or set SUBNET_CATEGORY_ID to create channels automatically).")
+
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    resolver.update(after)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    resolver.forget(channel.id, deleted=True)
+
+@bot.event
+async def on_thread_update(before, after):
+    resolver.update(after)
+
+@bot.event
+async def on_thread_delete(thread):
+    resolver.forget(thread.id, deleted=True)
+
+
+@bot.event
+async def on_message_edit(before, after):
+    # embeds/link previews often arrive as an edit; fold them into the pending burst, never re-summarize
+    if NEWS_UPDATES_CHANNEL_ID and after.channel.id == NEWS_UPDATES_CHANNEL_ID and after.author != bot.user:
+        if not news_coalescer.edit(after):
+            print(f"✏️ news {after.id} edited after it was summarized; ignored")
 
 
 @bot.event
 async def on_message(message):
+    # time every handler; route_message tags which path it took
+    labels = {"handler": "other"}
+    started = time.perf_counter()
+    try:
+        await route_message(message, labels)
+    finally:
+        REGISTRY.histogram("handler_seconds", "on_message handler latency").observe(
+            time.perf_counter() - started, **labels
+        )
+
+
+async def route_message(message, labels: Dict[str, str]):
     if message.author == bot.user:
         return
     # AUTO-SUMMARY for news channel
     if NEWS_UPDATES_CHANNEL_ID and message.channel.id == NEWS_UPDATES_CHANNEL_ID:
-        await handle_news_update(message)
+        labels["handler"] = "news"
+        news_coalescer.add(message)
         await bot.process_commands(message)
         return
 
     # 🔒 Only allow your user ID
-    if message.author.id != MY_USER_ID=YOUR_DISCORD_USER_ID:
+    if message.author.id != MY_USER_ID:
         await bot.process_commands(message)
         return
 
     # Only listen in #bittensor-curation
-    if message.channel.id == YOUR_BITTENSOR-CURATION_CHANNEL_ID: 
+    if message.channel.id == CURATION_CHANNEL_ID:
         print(f"📥 New message in #bittensor-curation: {message.content!r}")
+        labels["handler"] = "subnet"
 
-        import re
-        # Subnet number comes ONLY from what you typed (e.g., "62" or "62-")
-        m = re.match(r"^\s*(\d{2,3})(?:[\s\-\:\.])?$", (message.content or ""))
-        if not m:
+        # Subnet comes ONLY from what you typed: a netuid ("62", "62-") or an alias ("ridges")
+        m = SUBNET_TOKEN.match(message.content or "")
+        subnet = subnet_registry.lookup(m.group(1)) if m else None
+        if not m or (subnet is None and not m.group(1).isdigit()):
             await bot.process_commands(message)
             return
 
         subnet_number = m.group(1)
-
-        matched_option = next((k for k in SUBNET_CHANNELS if k.endswith(f"-{subnet_number}")), None)
-        if not matched_option:
-            await message.channel.send(f"❌ Subnet `-{subnet_number}` not found. Try one of: {', '.join(SUBNET_CHANNELS.keys())}")
+        if subnet is None:
+            mapped = list(subnet_registry.mapped())
+            await message.channel.send(
+                f"❌ Subnet `-{subnet_number}` not found. Try a netuid 0–{len(subnet_registry) - 1} or one of: "
+                f"{', '.join(mapped[:20])}{' …' if len(mapped) > 20 else ''}"
+            )
             pending_confirmations[message.author.id] = {"original": message}
             return
-
-        # Read convo: prefer attached .txt, else raw text (minus the prefix)
-        raw_text = ""
-        if message.attachments:
-            att = message.attachments[0]
-            if att.filename.endswith(".txt"):
-                raw_text = (await att.read()).decode("utf-8", errors="ignore")
-
-        if not raw_text:
-            raw_text = re.sub(r"^\s*\d{2,3}[\s\-\:\.]*", "", message.content or "", count=1).strip()
-
-        if not raw_text:
-            await message.channel.send("❌ I didn’t find any text to summarize (empty message / file).")
+        problem = subnet_not_routable(subnet)
+        if problem:
+            await message.channel.send(problem)
             return
 
-        n_words = len(raw_text.split())
-        cap = 50 if n_words <= 120 else (115 if n_words <= 400 else 145)
-
-        try:
-            summary = await summarize_subnet_with_kimi(matched_option, raw_text, cap)
-        except Exception as e:
-            summary = f"(Kimi error: {e!r})"
-
-        channel_id = SUBNET_CHANNELS[matched_option]
-        dest = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
-        await dest.send(f"🧾 Summary:\n{summary}")
-        print(f"✅ Routed + summarized {subnet_number} → {matched_option} (max_tokens={cap})")
+        # the job reads the convo: attached exports, else the raw text (minus the prefix)
+        submit_subnet_summary(subnet, message)
         return
 
     # Retry path (unchanged except it trusts only your replies)
     elif message.reference and message.reference.resolved:
         ref = message.reference.resolved
         if ref.author == bot.user and message.author.id in pending_confirmations:
-            retry_number = (message.content or "").strip()
-            if not retry_number.isdigit():
+            labels["handler"] = "retry"
+            retry_number = (message.content or "").strip().rstrip("-:. ")
+            if not SUBNET_TOKEN.match(retry_number):
                 await message.channel.send("❌ Please reply with just the subnet number (e.g. 62).")
                 return
 
-            matched_option = next((k for k in SUBNET_CHANNELS if k.endswith(f"-{retry_number}")), None)
-            if not matched_option:
+            subnet = subnet_registry.lookup(retry_number)
+            if subnet is None:
                 await message.channel.send(f"❌ Still no match for `-{retry_number}`. Please try again.")
                 return
-
-            original_msg = pending_confirmations[message.author.id]["original"]
-
-            raw_text = ""
-            if original_msg.attachments:
-                att = original_msg.attachments[0]
-                if att.filename.endswith(".txt"):
-                    raw_text = (await att.read()).decode("utf-8", errors="ignore")
-            if not raw_text:
-                raw_text = re.sub(r"^\s*\d{2,3}[\s\-\:\.]*", "", original_msg.content or "", count=1).strip()
-
-            if not raw_text:
-                await message.channel.send("❌ Original message had no usable text.")
+            problem = subnet_not_routable(subnet)
+            if problem:
+                await message.channel.send(problem)
                 return
 
-            n_words = len(raw_text.split())
-            cap = 400
-
-            try:
-                summary = await summarize_subnet_with_kimi(matched_option, raw_text, cap)
-            except Exception as e:
-                summary = f"(Kimi error: {e!r})"
-
-            channel_id = SUBNET_CHANNELS[matched_option]
-            dest = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
-            await dest.send(f"🧾 Summary:\n{summary}")
-            await message.channel.send(f"✅ Routed to `{matched_option}` with summarized output.")
+            original_msg = pending_confirmations[message.author.id]["original"]
+            submit_subnet_summary(subnet, original_msg, 400, confirm_to=message.channel)
             del pending_confirmations[message.author.id]
             return
 
     # keep commands like !hello working
     await bot.process_commands(message)
 
-bot.run(TOKEN)
+if __name__ == "__main__":
+    bot.run(TOKEN)
@@ -0,0 +1,124 @@
+"""
+Channel lookups with a cache in front of Discord's REST API.
+
+resolve() serves a destination channel from the gateway cache
+(client.get_channel) or its own TTL cache before falling back to a single
+fetch_channel; concurrent lookups of the same id share that one request.
+A channel only counts if it has the attribute the caller needs (`send` by
+default, `create_text_channel` for a category). Failures (unknown id,
+forbidden) are cached too, for `negative_ttl` seconds, so a bad id costs
+one REST call rather than one per message. prewarm() resolves every
+destination concurrently at startup, and update() / forget() keep the
+cache in step with channel update/delete events.
+"""
+import asyncio
+import time
+from typing import Dict, Tuple
+
+import discord
+
+
+class ChannelUnavailable(Exception):
+    def __init__(self, channel_id: int, reason: str):
+        super().__init__(f"channel {channel_id} unavailable: {reason}")
+        self.channel_id = channel_id
+        self.reason = reason
+
+
+def _usable(channel, need: str):
+    if not hasattr(channel, need):
+        kind = "a text channel/thread" if need == "send" else f"a channel with .{need}"
+        raise ChannelUnavailable(channel.id, f"not {kind} (type={type(channel).__name__})")
+    return channel
+
+
+class ChannelResolver:
+    def __init__(self, client, ttl: float = 3600.0, negative_ttl: float = 300.0, concurrency: int = 8):
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.concurrency = concurrency
+        self._ok: Dict[int, Tuple[object, float]] = {}      # id -> (channel, expires_at)
+        self._failed: Dict[int, Tuple[str, float]] = {}     # id -> (reason, expires_at)
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self.fetches = 0
+
+    async def resolve(self, channel_id: int, need: str = "send"):
+        """Return the channel for `channel_id` if it has a `need` attribute, or raise ChannelUnavailable."""
+        channel_id = int(channel_id)
+        now = time.monotonic()
+        hit = self._ok.get(channel_id)
+        if hit and hit[1] > now:
+            return _usable(hit[0], need)
+        failed = self._failed.get(channel_id)
+        if failed and failed[1] > now:
+            raise ChannelUnavailable(channel_id, failed[0])
+
+        channel = self.client.get_channel(channel_id)
+        if channel is not None:
+            self._store(channel)
+            return _usable(channel, need)
+
+        fut = self._inflight.get(channel_id)
+        if fut is None:
+            fut = self._inflight[channel_id] = asyncio.ensure_future(self._fetch(channel_id))
+            fut.add_done_callback(lambda _f: self._inflight.pop(channel_id, None))
+        return _usable(await asyncio.shield(fut), need)
+
+    async def _fetch(self, channel_id: int):
+        self.fetches += 1
+        try:
+            channel = await self.client.fetch_channel(channel_id)
+        except discord.NotFound:
+            reason = "not found"
+        except discord.Forbidden:
+            reason = "forbidden to view/send"
+        except discord.HTTPException as e:
+            reason = f"HTTP error while fetching ({e})"
+        else:
+            self._store(channel)
+            return channel
+        self._failed[channel_id] = (reason, time.monotonic() + self.negative_ttl)
+        raise ChannelUnavailable(channel_id, reason)
+
+    def _store(self, channel) -> None:
+        self._ok[channel.id] = (channel, time.monotonic() + self.ttl)
+        self._failed.pop(channel.id, None)
+
+    async def prewarm(self, targets: Dict[str, int]) -> Tuple[int, int]:
+        """Resolve every {name: channel_id} concurrently; returns (ok, failed)."""
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def one(name: str, channel_id) -> bool:
+            try:
+                channel_id = int(channel_id)
+            except (TypeError, ValueError):
+                print(f"❌ {name}: channel id is not a number -> {channel_id!r}")
+                return False
+            async with sem:
+                try:
+                    channel = await self.resolve(channel_id)
+                except ChannelUnavailable as e:
+                    print(f"❌ {name}: ID {channel_id} {e.reason}")
+                    return False
+            print(f"✅ warmed {name} -> #{getattr(channel, 'name', channel_id)} ({channel_id})")
+            return True
+
+        results = await asyncio.gather(*(one(n, c) for n, c in targets.items()))
+        ok = sum(results)
+        return ok, len(results) - ok
+
+    # --- gateway events ---
+    def update(self, channel) -> None:
+        if channel.id in self._ok or channel.id in self._failed:
+            self._store(channel)
+
+    def forget(self, channel_id: int, deleted: bool = False) -> None:
+        self._ok.pop(channel_id, None)
+        if deleted:
+            self._failed[channel_id] = ("deleted", time.monotonic() + self.negative_ttl)
+        else:
+            self._failed.pop(channel_id, None)
+
+    def stats(self) -> dict:
+        return {"cached": len(self._ok), "failed": len(self._failed), "fetches": self.fetches}
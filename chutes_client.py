@@ -0,0 +1,329 @@
+"""
+Long-lived client for the Chutes chat-completions API.
+
+One pooled aiohttp session is shared by every summarize_* helper, so each
+Kimi call reuses a warm keep-alive connection instead of paying a fresh
+TCP + TLS handshake. A semaphore caps how many requests are in flight.
+
+Failures are classified (ChutesError.retryable): 429 / 408 / 5xx, timeouts,
+dropped connections and garbled bodies are retried with jittered backoff
+(honoring Retry-After); other 4xx fail at once. A circuit breaker fails fast
+while Chutes is down, and optional hedging fires a duplicate request when
+one runs past the recent p95 latency.
+"""
+import asyncio
+import email.utils
+import json
+import os
+import random
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Optional
+
+import aiohttp
+
+CHUTES_URL = "https://llm.chutes.ai/v1/chat/completions"
+KIMI_MODEL = "moonshotai/Kimi-K2-Instruct-75k"
+
+
+class ChutesError(Exception):
+    def __init__(self, message: str, retryable: bool, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ChutesError):
+    def __init__(self, retry_in: float):
+        super().__init__(f"Chutes circuit open (retry in {retry_in:.0f}s)", retryable=False)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def classify_status(status: int, retry_after: Optional[str], text: str) -> ChutesError:
+    snippet = text[:200].strip()
+    retryable = status in (408, 425, 429) or status >= 500
+    return ChutesError(
+        f"HTTP {status}: {snippet}" if snippet else f"HTTP {status}",
+        retryable=retryable,
+        status=status,
+        retry_after=parse_retry_after(retry_after),
+    )
+
+
+class CircuitBreaker:
+    """closed -> (N consecutive failures) -> open -> (cooldown) -> half-open trial -> closed/open"""
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """Raise while open; True when this call is the half-open trial (end it with release_trial)."""
+        state = self.state
+        if state == "open":
+            raise CircuitOpenError(self.cooldown - (time.monotonic() - self.opened_at))
+        if state == "half-open":
+            if self._trial_running:
+                raise CircuitOpenError(0)
+            self._trial_running = True
+            return True
+        return False
+
+    def release_trial(self) -> None:
+        # a trial that ended without a verdict (cancelled, timed out by the caller) lets the next call try
+        self._trial_running = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        trial_failed, self._trial_running = self._trial_running, False
+        if trial_failed or (self.opened_at is None and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            print(f"🔌 Chutes circuit OPEN for {self.cooldown:.0f}s after {self.failures} failures")
+
+
+class ChutesClient:
+    def __init__(
+        self,
+        api_token: Optional[str] = None,
+        url: str = CHUTES_URL,
+        model: str = KIMI_MODEL,
+        max_concurrency: int = 4,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 120.0,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 30.0,
+        hedge: bool = False,
+        breaker: Optional[CircuitBreaker] = None,
+        on_usage: Optional[Callable[[dict], None]] = None,
+    ):
+        self.api_token = api_token or os.getenv("CHUTES_API_TOKEN")
+        self.url = url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(
+            total=None, connect=connect_timeout, sock_read=read_timeout
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge = hedge
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies: Deque[float] = deque(maxlen=200)  # successful attempts, seconds
+        self.hedges_fired = 0
+        self.on_usage = on_usage  # called with the response `usage` dict (prompt/completion tokens)
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_token}",
+            "Content-Type": "application/json",
+        }
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # created lazily so it binds to the bot's running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency * 2,  # pool size (a little headroom over the semaphore)
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    def build_body(self, prompt: str, max_tokens: int, stream: bool = False) -> dict:
+        body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": 0.3,
+            "stream": stream,
+        }
+        if stream:
+            body["stream_options"] = {"include_usage": True}  # usage arrives in the last chunk
+        return body
+
+    def _report_usage(self, usage) -> None:
+        if self.on_usage and isinstance(usage, dict):
+            self.on_usage(usage)
+
+    # --- resilience helpers ---
+    def p95_latency(self) -> Optional[float]:
+        if len(self.latencies) < 20:
+            return None  # not enough samples to hedge sensibly
+        lat = sorted(self.latencies)
+        return lat[int(0.95 * (len(lat) - 1))]
+
+    def backoff_delay(self, attempt: int, err: ChutesError) -> float:
+        if err.retry_after is not None:
+            return min(err.retry_after, self.backoff_cap * 4)
+        # "full jitter": uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    async def _attempt(self, body: dict) -> str:
+        """One POST; returns content or raises a classified ChutesError."""
+        async with self._sem:
+            started = time.monotonic()
+            try:
+                session = self._get_session()
+                async with session.post(self.url, headers=self.headers, json=body) as response:
+                    text = await response.text()
+                    if response.status >= 400:
+                        raise classify_status(response.status, response.headers.get("Retry-After"), text)
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                raise ChutesError(f"network error: {e!r}", retryable=True) from e
+            try:
+                result = json.loads(text)
+                content = result["choices"][0]["message"]["content"]
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                raise ChutesError(f"malformed response ({e!r}): {text[:200]!r}", retryable=True) from e
+            self.latencies.append(time.monotonic() - started)
+            self._report_usage(result.get("usage"))
+            return content
+
+    async def _hedged_attempt(self, body: dict) -> str:
+        """Run one attempt; if it outlives the recent p95, race a duplicate and keep the winner."""
+        threshold = self.p95_latency() if self.hedge else None
+        primary = asyncio.ensure_future(self._attempt(body))
+        if threshold is None:
+            return await primary
+        pending = {primary}
+        first_error: Optional[BaseException] = None
+        try:  # whatever is still running when this returns, raises or is cancelled gets cancelled
+            done, pending = await asyncio.wait(pending, timeout=threshold)
+            if done:
+                return primary.result()
+            self.hedges_fired += 1
+            pending.add(asyncio.ensure_future(self._attempt(body)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    first_error = first_error or task.exception()
+            raise first_error  # both failed
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def complete(self, prompt: str, max_tokens: int = 400) -> str:
+        """Single non-streaming completion with retries, hedging and the circuit breaker."""
+        body = self.build_body(prompt, max_tokens)
+        attempt = 0
+        while True:
+            trial = self.breaker.before_call()
+            try:
+                content = await self._hedged_attempt(body)
+            except ChutesError as e:
+                if e.retryable:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()  # e.g. a 400/401 still proves Chutes is up
+                if not e.retryable or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                print(f"🔁 Kimi retry {attempt + 1}/{self.max_retries} in {delay:.1f}s ({e})")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            finally:
+                if trial:
+                    self.breaker.release_trial()
+            self.breaker.record_success()
+            return content
+
+    async def stream(self, prompt: str, max_tokens: int = 400) -> AsyncIterator[str]:
+        """
+        Streaming completion: yields content deltas as Chutes sends them
+        (OpenAI-style server-sent events, terminated by `data: [DONE]`).
+        Failures before the first delta are retried like complete(); once
+        text has been yielded an error is raised to the caller as-is.
+        """
+        body = self.build_body(prompt, max_tokens, stream=True)
+        attempt = 0
+        while True:
+            trial = self.breaker.before_call()
+            yielded = False
+            try:
+                async with self._sem:
+                    try:
+                        session = self._get_session()
+                        async with session.post(self.url, headers=self.headers, json=body) as response:
+                            if response.status >= 400:
+                                raise classify_status(
+                                    response.status, response.headers.get("Retry-After"), await response.text()
+                                )
+                            async for raw in response.content:
+                                line = raw.decode("utf-8", errors="ignore").strip()
+                                if not line.startswith("data:"):
+                                    continue  # blank keep-alives / comments
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    break
+                                try:
+                                    chunk = json.loads(data)
+                                except ValueError:
+                                    continue
+                                self._report_usage(chunk.get("usage"))
+                                for choice in chunk.get("choices") or []:
+                                    delta = (choice.get("delta") or {}).get("content")
+                                    if delta:
+                                        yielded = True
+                                        yield delta
+                    except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                        raise ChutesError(f"network error: {e!r}", retryable=True) from e
+            except ChutesError as e:
+                if e.retryable:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if yielded or not e.retryable or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                print(f"🔁 Kimi stream retry {attempt + 1}/{self.max_retries} in {delay:.1f}s ({e})")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            finally:
+                if trial:  # also runs when the caller cancels or abandons the generator mid-stream
+                    self.breaker.release_trial()
+            self.breaker.record_success()
+            return
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,225 @@
+"""
+Outbound Discord sending for digests and long summaries.
+
+- MessagePacker merges sections into as few messages as possible under
+  Discord's 2000-char limit, splitting oversized sections at safe boundaries
+  (blank line > line > sentence > word) so links are never cut in half.
+- ChannelSender queues sends per channel, keeps each channel inside its
+  message rate bucket (5 messages / 5s by default) and records send latency.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+import discord
+
+MESSAGE_LIMIT = 2000
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBEDS_PER_MESSAGE = 10
+EMBED_TOTAL_LIMIT = 6000
+
+_BOUNDARIES = ("\n\n", "\n", ". ", " ")
+
+
+def split_text(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Split `text` into pieces <= limit, cutting at the safest boundary available."""
+    pieces: List[str] = []
+    while len(text) > limit:
+        cut = -1
+        for sep in _BOUNDARIES:
+            # only accept a boundary in the back half, so pieces stay reasonably full
+            i = text.rfind(sep, limit // 2, limit)
+            if i > 0:
+                cut = i + (1 if sep == ". " else 0)
+                break
+        if cut <= 0:
+            cut = limit  # one unbroken token longer than the limit
+        pieces.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+class MessagePacker:
+    """Incrementally pack sections; add() returns messages that are full and ready to send."""
+
+    def __init__(self, limit: int = MESSAGE_LIMIT, sep: str = "\n\n"):
+        self.limit = limit
+        self.sep = sep
+        self._buf = ""
+
+    def add(self, section: str) -> List[str]:
+        ready: List[str] = []
+        for piece in split_text(section.strip(), self.limit):
+            if not self._buf:
+                self._buf = piece
+            elif len(self._buf) + len(self.sep) + len(piece) <= self.limit:
+                self._buf += self.sep + piece
+            else:
+                ready.append(self._buf)
+                self._buf = piece
+        return ready
+
+    def flush(self) -> List[str]:
+        ready, self._buf = ([self._buf] if self._buf else []), ""
+        return ready
+
+
+def pack_messages(sections: List[str], limit: int = MESSAGE_LIMIT) -> List[str]:
+    packer = MessagePacker(limit)
+    out: List[str] = []
+    for section in sections:
+        out.extend(packer.add(section))
+    return out + packer.flush()
+
+
+def pack_code_blocks(title: str, lines: List[str], limit: int = MESSAGE_LIMIT) -> List[str]:
+    """`title` then `lines` in ``` fences, one complete fence per message (long lines are cut)."""
+    fence_open, fence_close = "```\n", "\n```"
+    room = limit - len(title) - 1 - len(fence_open) - len(fence_close)
+    out: List[str] = []
+    body: List[str] = []
+    size = 0
+    for line in lines:
+        line = line[:room]
+        if body and size + 1 + len(line) > room:
+            out.append(fence_open + "\n".join(body) + fence_close)
+            body, size = [], 0
+        size += len(line) + (1 if body else 0)
+        body.append(line)
+    out.append(fence_open + "\n".join(body) + fence_close)
+    out[0] = f"{title}\n{out[0]}"
+    return out
+
+
+def pack_embeds(sections: List[str]) -> List[List[discord.Embed]]:
+    """Pack sections into embed descriptions, then group embeds per message (10 / 6000 chars)."""
+    messages: List[List[discord.Embed]] = []
+    current: List[discord.Embed] = []
+    total = 0
+    for desc in pack_messages(sections, EMBED_DESCRIPTION_LIMIT):
+        if current and (len(current) >= EMBEDS_PER_MESSAGE or total + len(desc) > EMBED_TOTAL_LIMIT):
+            messages.append(current)
+            current, total = [], 0
+        current.append(discord.Embed(description=desc))
+        total += len(desc)
+    if current:
+        messages.append(current)
+    return messages
+
+
+class _Bucket:
+    """Sliding window: at most `limit` sends per `per` seconds."""
+
+    def __init__(self, limit: int, per: float):
+        self.limit = limit
+        self.per = per
+        self.sent: Deque[float] = deque()
+
+    async def wait(self) -> None:
+        while True:
+            now = time.monotonic()
+            while self.sent and now - self.sent[0] >= self.per:
+                self.sent.popleft()
+            if len(self.sent) < self.limit:
+                self.sent.append(now)
+                return
+            await asyncio.sleep(self.per - (now - self.sent[0]))
+
+
+class ChannelSender:
+    def __init__(
+        self,
+        per_channel_limit: int = 5,
+        per_channel_window: float = 5.0,
+        global_per_second: int = 45,
+        on_sent: Optional[Callable[[float, float, bool], None]] = None,
+    ):
+        self.per_channel_limit = per_channel_limit
+        self.per_channel_window = per_channel_window
+        self._global = _Bucket(global_per_second, 1.0)
+        self._queues: Dict[int, asyncio.Queue] = {}
+        self._buckets: Dict[int, _Bucket] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self.latencies: Deque[float] = deque(maxlen=500)  # enqueue -> sent, seconds
+        self.sent = 0
+        self.failed = 0
+        self.on_sent = on_sent  # (queued+sent seconds, send call seconds, ok)
+
+    def enqueue(
+        self, channel, content: Optional[str] = None, embeds: Optional[List[discord.Embed]] = None
+    ) -> "asyncio.Future[discord.Message]":
+        """Queue one send on `channel`; returns a future for the sent message."""
+        cid = channel.id
+        if cid not in self._queues:
+            self._queues[cid] = asyncio.Queue()
+            self._buckets[cid] = _Bucket(self.per_channel_limit, self.per_channel_window)
+        worker = self._workers.get(cid)
+        if worker is None or worker.done():
+            self._workers[cid] = asyncio.create_task(self._run(cid))
+        fut = asyncio.get_running_loop().create_future()
+        kwargs = {"content": content} if embeds is None else {"content": content, "embeds": embeds}
+        self._queues[cid].put_nowait((channel, kwargs, fut, time.monotonic()))
+        return fut
+
+    async def send(self, channel, content: Optional[str] = None, embeds: Optional[List[discord.Embed]] = None):
+        return await self.enqueue(channel, content, embeds)
+
+    async def send_sections(self, channel, sections: List[str], use_embeds: bool = False) -> None:
+        """Pack `sections` and send them in order, waiting until all are delivered."""
+        if use_embeds:
+            futs = [self.enqueue(channel, embeds=group) for group in pack_embeds(sections)]
+        else:
+            futs = [self.enqueue(channel, msg) for msg in pack_messages(sections)]
+        await asyncio.gather(*futs, return_exceptions=True)
+
+    async def _run(self, cid: int) -> None:
+        queue = self._queues[cid]
+        bucket = self._buckets[cid]
+        while True:
+            channel, kwargs, fut, queued_at = await queue.get()
+            ok = False
+            call_started = time.monotonic()
+            try:
+                await bucket.wait()
+                await self._global.wait()
+                call_started = time.monotonic()
+                msg = await channel.send(**kwargs)
+                ok = True
+                self.sent += 1
+                if not fut.done():
+                    fut.set_result(msg)
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ send to {cid} failed: {e!r}")
+                if not fut.done():
+                    fut.set_exception(e)
+            finally:
+                now = time.monotonic()
+                self.latencies.append(now - queued_at)
+                if self.on_sent:
+                    self.on_sent(now - queued_at, now - call_started, ok)
+                queue.task_done()
+
+    def stats(self) -> dict:
+        lat = sorted(self.latencies)
+
+        def pct(p: float) -> float:
+            return lat[min(len(lat) - 1, int(p * len(lat)))] if lat else 0.0
+
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "queued": sum(q.qsize() for q in self._queues.values()),
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "max": lat[-1] if lat else 0.0,
+        }
+
+    async def close(self) -> None:
+        for task in self._workers.values():
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
@@ -0,0 +1,193 @@
+"""
+Background job queue for LLM work.
+
+Event handlers submit() a job and return at once; a fixed pool of worker
+tasks runs the jobs in priority order (interactive subnet TLDRs, then news,
+then the digest). The pool size is the global budget for concurrent LLM
+jobs, and `reserved` workers only ever take interactive jobs, so a long
+digest can't hold up a TLDR. Jobs with the same `key` are deduplicated:
+a repeat submission is dropped, or with replace=True supersedes (cancels)
+the older job.
+"""
+import asyncio
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NEWS = 1
+PRIORITY_DIGEST = 2
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_NEWS: "news", PRIORITY_DIGEST: "digest"}
+
+_ids = itertools.count(1)
+
+
+@dataclass
+class Job:
+    kind: str
+    priority: int
+    fn: Callable[..., Awaitable[Any]]
+    args: tuple = ()
+    key: Optional[str] = None
+    id: int = field(default_factory=lambda: next(_ids))
+    status: str = "queued"  # queued -> running -> done / failed / cancelled
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    finished: asyncio.Event = field(default_factory=asyncio.Event, repr=False)  # set once done/failed/cancelled
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def describe(self) -> str:
+        now = time.monotonic()
+        if self.status == "queued":
+            age = f"waiting {now - self.created_at:.0f}s"
+        elif self.status == "running":
+            age = f"running {now - self.started_at:.0f}s"
+        else:
+            age = f"took {(self.finished_at or now) - (self.started_at or self.created_at):.1f}s"
+        tail = f" — {self.error}" if self.error else ""
+        return f"#{self.id} {self.kind} [{PRIORITY_NAMES.get(self.priority, self.priority)}] {self.status}, {age}{tail}"
+
+
+class JobQueue:
+    def __init__(
+        self,
+        workers: int = 3,
+        reserved: int = 1,
+        history: int = 50,
+        on_finished: Optional[Callable[[Job], None]] = None,
+    ):
+        self.workers = max(1, workers)
+        self.reserved = min(max(0, reserved), self.workers - 1)  # at least one worker takes anything
+        self.on_finished = on_finished  # called once per job that ran or was cancelled
+        self._queues: Dict[int, Deque[Job]] = {}
+        self._by_key: Dict[str, Job] = {}
+        self._running: Dict[int, Job] = {}
+        self._history: Deque[Job] = deque(maxlen=history)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _start(self) -> None:
+        # created lazily so the workers bind to the bot's running event loop
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        for i in range(self.workers):
+            max_priority = PRIORITY_INTERACTIVE if i < self.reserved else None
+            self._tasks.append(asyncio.create_task(self._worker(max_priority)))
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[..., Awaitable[Any]],
+        *args,
+        priority: int = PRIORITY_NEWS,
+        key: Optional[str] = None,
+        replace: bool = False,
+    ) -> Job:
+        """
+        Queue fn(*args) and return its Job. If a job with the same key is
+        still queued or running, it is returned instead (replace=False) or
+        cancelled in favour of the new one (replace=True).
+        """
+        self._start()
+        existing = self._by_key.get(key) if key else None
+        if existing is not None and existing.active:
+            if not replace:
+                print(f"⏭️ job {kind} ({key}) already {existing.status} as #{existing.id}; duplicate dropped")
+                return existing
+            self.cancel(existing.id, reason="superseded")
+        job = Job(kind=kind, priority=priority, fn=fn, args=args, key=key)
+        if key:
+            self._by_key[key] = job
+        self._queues.setdefault(priority, deque()).append(job)
+        self._wakeup.set()
+        return job
+
+    def cancel(self, job_id: int, reason: str = "cancelled") -> bool:
+        for job in self.jobs():
+            if job.id == job_id and job.active:
+                if job.status == "running" and job.task is not None:
+                    job.task.cancel()
+                self._finish(job, "cancelled", reason)
+                return True
+        return False
+
+    def jobs(self) -> List[Job]:
+        """Running, then queued (in run order), then recently finished jobs."""
+        queued = [j for p in sorted(self._queues) for j in self._queues[p] if j.active]
+        return list(self._running.values()) + queued + list(reversed(self._history))
+
+    def stats(self) -> dict:
+        queued = {PRIORITY_NAMES.get(p, str(p)): sum(1 for j in q if j.active) for p, q in self._queues.items()}
+        return {"running": len(self._running), "queued": queued, "workers": self.workers}
+
+    def _pop(self, max_priority: Optional[int]) -> Optional[Job]:
+        for p in sorted(self._queues):
+            if max_priority is not None and p > max_priority:
+                break
+            q = self._queues[p]
+            while q:
+                job = q.popleft()
+                if job.status == "queued":  # cancelled jobs are just skipped
+                    return job
+        return None
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        if not job.active:
+            return
+        job.status = status
+        job.error = error
+        job.finished_at = time.monotonic()
+        self._running.pop(job.id, None)
+        if job.key and self._by_key.get(job.key) is job:
+            del self._by_key[job.key]
+        self._history.append(job)
+        job.finished.set()
+        if self.on_finished:
+            self.on_finished(job)
+
+    async def _worker(self, max_priority: Optional[int]) -> None:
+        while True:
+            job = self._pop(max_priority)
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            job.status = "running"
+            job.started_at = time.monotonic()
+            self._running[job.id] = job
+            job.task = asyncio.create_task(job.fn(*job.args))
+            try:
+                await asyncio.wait({job.task})
+            except asyncio.CancelledError:  # queue shutting down
+                job.task.cancel()
+                self._finish(job, "cancelled", "shutdown")
+                raise
+            if job.task.cancelled():
+                self._finish(job, "cancelled", job.error or "cancelled")
+            elif job.task.exception() is not None:
+                e = job.task.exception()
+                print(f"❌ job #{job.id} {job.kind} failed: {e!r}")
+                self._finish(job, "failed", repr(e))
+            else:
+                self._finish(job, "done")
+
+    async def join(self, poll: float = 0.05) -> None:
+        """Wait until nothing is queued or running (benchmarks, tests, shutdown)."""
+        while self._running or any(j.status == "queued" for q in self._queues.values() for j in q):
+            await asyncio.sleep(poll)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
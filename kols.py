@@ -0,0 +1,37 @@
+"""
+The KOL handles the digest follows, shared by bot.py and scraper_twikit.py.
+
+Read from kol_handles.txt (one handle per line, leading @ optional, # starts
+a comment) when that file exists, else the built-in list below. Set
+KOL_HANDLES_FILE to use another path. Both processes import KOL_HANDLES
+from here, so the scraper and the digest always cover the same accounts.
+"""
+import os
+from pathlib import Path
+from typing import List
+
+DEFAULT_HANDLES: List[str] = [
+    "TAOTemplar", "JosephJacks_", "jaltucher", "KeithSingery", "SiamKidd", "markjeffrey",
+    "Taotreasuries", "here4impact", "SubnetStats", "mogmachine", "const_reborn", "shibshib89",
+    "Old_Samster", "bittingthembits", "badenglishtea", "learnbittensor", "Obsessedfan5",
+]
+
+HANDLES_FILE = Path(os.getenv("KOL_HANDLES_FILE", Path(__file__).parent / "kol_handles.txt"))
+
+
+def load_handles(path: Path = HANDLES_FILE) -> List[str]:
+    try:
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return list(DEFAULT_HANDLES)
+    handles: List[str] = []
+    seen = set()
+    for line in lines:
+        handle = line.split("#", 1)[0].strip().lstrip("@")
+        if handle and handle.lower() not in seen:
+            seen.add(handle.lower())
+            handles.append(handle)
+    return handles
+
+
+KOL_HANDLES: List[str] = load_handles()
@@ -0,0 +1,240 @@
+"""
+The digest's "Links & Media" pipeline.
+
+canonicalize() gives every URL one spelling: lowercase host without
+"www.", twitter.com / mobile hosts folded into x.com, default ports,
+fragments, trailing slashes and tracking parameters (utm_*, fbclid, X's
+?s=/&t= share tags, ...) dropped, the remaining query sorted. HostIndex
+matches a URL's parsed host against a set of domains by walking its dot
+suffixes (one set lookup per label), so "docs.github.com" matches
+"github.com" but "github.com.evil.io" does not. LinkExpander follows
+short links (t.co, bit.ly, ...) with HEAD requests, a few at a time, and
+keeps what it found in a small SQLite file for `ttl_seconds`. order_links()
+puts it together for one section: canonical, expanded, allowlisted hosts
+first, and nothing already in `seen` — pass one set for a whole digest and
+each link is listed once, under the first section that has it.
+"""
+import asyncio
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import unquote, urljoin, urlsplit, urlunsplit
+
+import aiohttp
+
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "twclid", "yclid", "igshid", "si",
+    "mc_cid", "mc_eid", "_hsenc", "_hsmi", "mkt_tok", "ref_src", "ref_url",
+})
+# share tags X appends to post links; on other sites ?t= / ?s= can be real (a YouTube timestamp)
+X_SHARE_PARAMS = frozenset({"s", "t"})
+HOST_ALIASES = {
+    "twitter.com": "x.com", "mobile.twitter.com": "x.com", "mobile.x.com": "x.com",
+    "m.youtube.com": "youtube.com", "music.youtube.com": "youtube.com",
+}
+SHORTENERS = (
+    "t.co", "bit.ly", "buff.ly", "ow.ly", "tinyurl.com", "lnkd.in", "dlvr.it",
+    "goo.gl", "trib.al", "is.gd", "rebrand.ly", "shorturl.at", "tiny.cc",
+)
+_REDIRECTS = (301, 302, 303, 307, 308)
+_TRAILING = ").,>]'\""
+
+
+def host_of(url: str) -> str:
+    try:
+        host = urlsplit(url.strip()).hostname or ""
+    except ValueError:
+        return ""
+    host = host.rstrip(".")
+    host = host[4:] if host.startswith("www.") else host
+    return HOST_ALIASES.get(host, host)
+
+
+def canonicalize(url: str) -> str:
+    url = (url or "").strip().rstrip(_TRAILING)
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return url
+    host = host_of(url)
+    if port and port != {"http": 80, "https": 443}[scheme]:
+        host = f"{host}:{port}"
+    drop = X_SHARE_PARAMS if host == "x.com" else frozenset()
+    query = []
+    for pair in parts.query.split("&"):
+        key = unquote(pair.split("=", 1)[0]).lower()
+        if pair and not key.startswith("utm_") and key not in TRACKING_PARAMS and key not in drop:
+            query.append(pair)
+    return urlunsplit((scheme, host, parts.path.rstrip("/"), "&".join(sorted(query)), ""))
+
+
+class HostIndex:
+    """A set of domains matched by parsed-host suffix."""
+
+    def __init__(self, domains: Iterable[str]):
+        self.domains = frozenset(d.strip().lower().lstrip(".") for d in domains if d.strip())
+
+    def match(self, url: str) -> Optional[str]:
+        """The indexed domain `url`'s host is, or is a subdomain of; None if none."""
+        host = host_of(url)
+        while host:
+            if host in self.domains:
+                return host
+            _, _, host = host.partition(".")
+        return None
+
+    def __contains__(self, url: str) -> bool:
+        return self.match(url) is not None
+
+
+def order_links(
+    urls: Iterable[str], allowlist: HostIndex, expanded: Optional[Dict[str, str]] = None, seen: Optional[Set[str]] = None
+) -> List[str]:
+    """
+    Canonical (and, where `expanded` knows them, expanded) links, de-duplicated
+    and allowlisted hosts first. Links already in `seen` are left out; the
+    rest are added to it.
+    """
+    expanded = expanded or {}
+    seen = set() if seen is None else seen
+    safe: List[str] = []
+    other: List[str] = []
+    for url in urls:
+        if not url:
+            continue
+        url = canonicalize(url)
+        url = expanded.get(url, url)
+        if url in seen:
+            continue
+        seen.add(url)
+        (safe if url in allowlist else other).append(url)
+    return safe + other
+
+
+class LinkExpander:
+    """
+    Short link -> canonical target, followed a hop at a time (only while the
+    next hop is still a short link) and cached on disk. Links that can't be
+    followed are cached as themselves for `failure_ttl` so a dead shortener
+    isn't retried on every digest.
+    """
+
+    def __init__(
+        self,
+        cache_path: Path,
+        ttl_seconds: float = 30 * 24 * 3600,
+        failure_ttl: float = 3600,
+        concurrency: int = 8,
+        timeout: float = 5.0,
+        max_hops: int = 5,
+        shorteners: Iterable[str] = SHORTENERS,
+        on_result: Optional[Callable[[str], None]] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.failure_ttl = failure_ttl
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_hops = max_hops
+        self.shorteners = HostIndex(shorteners)
+        self.on_result = on_result  # called with "cached" / "expanded" / "failed" / "timeout" per short link
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._db = sqlite3.connect(str(cache_path))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS expansions (
+                url        TEXT PRIMARY KEY,
+                target     TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._db.close()
+
+    def _report(self, outcome: str) -> None:
+        if self.on_result is not None:
+            self.on_result(outcome)
+
+    def cached(self, urls: Iterable[str]) -> Dict[str, str]:
+        urls = list(urls)
+        out: Dict[str, str] = {}
+        for i in range(0, len(urls), 500):  # stay under SQLite's bound-variable limit
+            chunk = urls[i:i + 500]
+            rows = self._db.execute(
+                f"SELECT url, target FROM expansions WHERE expires_at > ? AND url IN ({','.join('?' * len(chunk))})",
+                (time.time(), *chunk),
+            )
+            out.update(rows)
+        return out
+
+    def _store(self, url: str, target: str, ttl: float) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO expansions (url, target, expires_at) VALUES (?, ?, ?)",
+            (url, target, time.time() + ttl),
+        )
+
+    async def _follow(self, url: str) -> str:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        current = url
+        for _ in range(self.max_hops):
+            async with self._session.head(current, allow_redirects=False) as resp:
+                status, location = resp.status, resp.headers.get("Location")
+            if status in (403, 405, 501):  # some shorteners only redirect GETs
+                async with self._session.get(current, allow_redirects=False) as resp:
+                    status, location = resp.status, resp.headers.get("Location")
+            if status not in _REDIRECTS or not location:
+                break
+            current = urljoin(current, location)
+            if current not in self.shorteners:
+                break  # the destination itself is never fetched
+        return canonicalize(current)
+
+    async def expand_all(self, urls: Iterable[str], budget: Optional[float] = None) -> Dict[str, str]:
+        """
+        {canonical short link: canonical target} for the short links among
+        `urls`. Cached ones are answered at once; the rest are followed
+        `concurrency` at a time, and whatever hasn't finished after `budget`
+        seconds is left out.
+        """
+        short = sorted({c for c in map(canonicalize, urls) if c in self.shorteners})
+        hits = self.cached(short)
+        out = {u: t for u, t in hits.items() if t != u}
+        for _ in hits:
+            self._report("cached")
+        misses = [u for u in short if u not in hits]
+        if not misses:
+            return out
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def one(url: str) -> None:
+            async with sem:
+                try:
+                    target = await asyncio.wait_for(self._follow(url), self.timeout)
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                    target = url
+            if target == url:
+                self._store(url, url, self.failure_ttl)
+                self._report("failed")
+            else:
+                self._store(url, target, self.ttl_seconds)
+                self._report("expanded")
+                out[url] = target
+
+        tasks = [asyncio.create_task(one(u)) for u in misses]
+        _, pending = await asyncio.wait(tasks, timeout=budget)
+        for task in pending:
+            task.cancel()
+            self._report("timeout")
+        self._db.commit()
+        return out
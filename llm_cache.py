@@ -0,0 +1,101 @@
+"""
+Persistent, content-addressed cache for Kimi completions.
+
+Entries are keyed on sha256(model, prompt, max_tokens) and stored in a small
+SQLite file next to the bot, so re-running !kol_now, a routing retry, or a
+repeated announcement is served locally instead of paying for the same
+prompt again. Entries expire after a TTL; when the cache grows past
+max_entries the least-recently-used rows are evicted.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+
+def cache_key(model: str, prompt: str, max_tokens: int) -> str:
+    raw = json.dumps([model, prompt, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: Path, ttl_seconds: float = 24 * 3600, max_entries: int = 2000):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = sqlite3.connect(str(self.path))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key        TEXT PRIMARY KEY,
+                value      TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                used_at    REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS completions_used_at ON completions(used_at)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        row = self._db.execute(
+            "SELECT value, created_at FROM completions WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[1] > self.ttl_seconds:
+            if row is not None:
+                self._db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._db.commit()
+            self.misses += 1
+            return None
+        self._db.execute("UPDATE completions SET used_at = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO completions (key, value, created_at, used_at) VALUES (?, ?, ?, ?)",
+            (key, value, now, now),
+        )
+        self._evict(now)
+        self._db.commit()
+
+    def _evict(self, now: float) -> None:
+        cur = self._db.execute(
+            "DELETE FROM completions WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        self.evictions += max(cur.rowcount, 0)
+        (count,) = self._db.execute("SELECT COUNT(*) FROM completions").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            cur = self._db.execute(
+                """
+                DELETE FROM completions WHERE key IN (
+                    SELECT key FROM completions ORDER BY used_at ASC LIMIT ?
+                )
+                """,
+                (overflow,),
+            )
+            self.evictions += max(cur.rowcount, 0)
+
+    def stats(self) -> dict:
+        (size,) = self._db.execute("SELECT COUNT(*) FROM completions").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        self._db.close()
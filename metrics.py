@@ -0,0 +1,157 @@
+"""
+In-process metrics: counters and latency histograms, Prometheus text format.
+
+    from metrics import REGISTRY, timed
+    with timed("kimi_request_seconds", path="complete"):
+        ...
+
+serve_metrics() exposes them on http://127.0.0.1:<port>/metrics for a local
+Prometheus (or curl); summary_lines() feeds the !stats command.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        k = _key(labels)
+        self.values[k] = self.values.get(k, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_fmt_labels(k)} {v:g}" for k, v in sorted(self.values.items())]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # per label set: [bucket counts..., +Inf count], sum
+        self.counts: Dict[LabelKey, List[int]] = {}
+        self.sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        k = _key(labels)
+        counts = self.counts.setdefault(k, [0] * (len(self.buckets) + 1))
+        for i, b in enumerate(self.buckets):
+            if value <= b:
+                counts[i] += 1
+        counts[-1] += 1
+        self.sums[k] = self.sums.get(k, 0.0) + value
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Bucket upper bound that covers quantile q (coarse, like histogram_quantile)."""
+        counts = self.counts.get(_key(labels))
+        if not counts or not counts[-1]:
+            return None
+        target = q * counts[-1]
+        for i, b in enumerate(self.buckets):
+            if counts[i] >= target:
+                return b
+        return float("inf")
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for k, counts in sorted(self.counts.items()):
+            for i, b in enumerate(self.buckets):
+                lines.append(f"{self.name}_bucket{_fmt_labels(k, ('le', f'{b:g}'))} {counts[i]}")
+            lines.append(f"{self.name}_bucket{_fmt_labels(k, ('le', '+Inf'))} {counts[-1]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(k)} {self.sums[k]:.6f}")
+            lines.append(f"{self.name}_count{_fmt_labels(k)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self, prefix: str = "bot_"):
+        self.prefix = prefix
+        self.metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        name = self.prefix + name
+        if name not in self.metrics:
+            self.metrics[name] = Counter(name, help)
+        return self.metrics[name]
+
+    def histogram(self, name: str, help: str = "") -> Histogram:
+        name = self.prefix + name
+        if name not in self.metrics:
+            self.metrics[name] = Histogram(name, help)
+        return self.metrics[name]
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self.metrics.values():
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+@contextmanager
+def timed(name: str, help: str = "", **labels) -> Iterator[None]:
+    """Observe the wall time of the block into histogram `name` (works inside async code too)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.histogram(name, help).observe(time.perf_counter() - started, **labels)
+
+
+def summary_lines() -> List[str]:
+    """Human-readable one-liners (count, p50, p95 per label set) for !stats."""
+    out: List[str] = []
+    for m in REGISTRY.metrics.values():
+        short = m.name[len(REGISTRY.prefix):]
+        if isinstance(m, Histogram):
+            for k, counts in sorted(m.counts.items()):
+                labels = dict(k)
+                p50, p95 = m.quantile(0.5, **labels), m.quantile(0.95, **labels)
+                tag = ",".join(f"{a}={b}" for a, b in k)
+                out.append(
+                    f"{short}{'{' + tag + '}' if tag else ''}: n={counts[-1]} "
+                    f"avg={m.sums[k] / counts[-1]:.2f}s p50≤{p50:g}s p95≤{p95:g}s"
+                )
+        elif isinstance(m, Counter):
+            for k, v in sorted(m.values.items()):
+                tag = ",".join(f"{a}={b}" for a, b in k)
+                out.append(f"{short}{'{' + tag + '}' if tag else ''}: {v:g}")
+    return out
+
+
+async def serve_metrics(port: int, host: str = "127.0.0.1") -> web.AppRunner:
+    async def handle(_request: web.Request) -> web.Response:
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"📈 metrics on http://{host}:{port}/metrics")
+    return runner
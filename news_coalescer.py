@@ -0,0 +1,141 @@
+"""
+Debounce and dedupe for the news watcher.
+
+Announcement bots post bursts (a message, then an embed, then a follow-up)
+and cross-posts repeat the same text. NewsCoalescer groups messages from
+the same author in the same channel until `window` seconds pass without a
+new one (never longer than `max_wait`), then hands the whole burst to
+`on_burst` once. Edits to a message still waiting in a burst replace it in
+place; edits to one already handed off are ignored.
+
+content_fingerprint() hashes normalized text + URLs, and seen() remembers
+fingerprints for `seen_ttl` seconds so repeated content is skipped;
+forget() drops them again when their summary failed.
+"""
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+_URL = re.compile(r"https?://\S+")
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACE = re.compile(r"\s+")
+# per-message CDN copies differ on every cross-post, so they don't identify content
+_VOLATILE_HOSTS = ("cdn.discordapp.com", "media.discordapp.net")
+
+
+def normalize_url(url: str) -> str:
+    url = url.strip().rstrip(").,>]'\"")
+    m = re.match(r"(?i)(https?)://([^/?#]+)(.*)", url)
+    if not m:
+        return url
+    scheme, host, rest = m.groups()
+    return f"{scheme.lower()}://{host.lower()}{rest.rstrip('/')}"
+
+
+def normalize_text(text: str) -> str:
+    text = _URL.sub(" ", text or "").lower()
+    return _SPACE.sub(" ", _NON_WORD.sub(" ", text)).strip()
+
+
+def content_fingerprint(text: str, urls: Iterable[str] = ()) -> str:
+    keep = sorted({
+        normalize_url(u) for u in list(urls) + _URL.findall(text or "")
+        if not any(h in u for h in _VOLATILE_HOSTS)
+    })
+    raw = normalize_text(text) + "\n" + "\n".join(keep)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Burst:
+    def __init__(self):
+        self.messages: "OrderedDict[int, Any]" = OrderedDict()
+        self.first_at = time.monotonic()
+        self.timer: Optional[asyncio.Task] = None
+
+
+class NewsCoalescer:
+    def __init__(
+        self,
+        on_burst: Callable[[List[Any]], None],
+        window: float = 8.0,
+        max_wait: float = 30.0,
+        seen_ttl: float = 24 * 3600,
+        max_seen: int = 5000,
+    ):
+        self.on_burst = on_burst  # called with the burst's messages, oldest first
+        self.window = window
+        self.max_wait = max_wait
+        self.seen_ttl = seen_ttl
+        self.max_seen = max_seen
+        self._bursts: Dict[Tuple[int, int], _Burst] = {}
+        self._where: Dict[int, Tuple[int, int]] = {}  # message id -> burst key
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self.coalesced = 0
+        self.duplicates = 0
+
+    def add(self, message) -> None:
+        key = (message.channel.id, message.author.id)
+        burst = self._bursts.get(key)
+        if burst is None:
+            burst = self._bursts[key] = _Burst()
+        else:
+            self.coalesced += 1
+            burst.timer.cancel()
+        burst.messages[message.id] = message
+        self._where[message.id] = key
+        delay = min(self.window, max(0.0, self.max_wait - (time.monotonic() - burst.first_at)))
+        burst.timer = asyncio.create_task(self._flush_later(key, delay))
+
+    def edit(self, message) -> bool:
+        """Swap in the edited message if its burst is still pending; False if it was already handed off."""
+        key = self._where.get(message.id)
+        burst = self._bursts.get(key) if key else None
+        if burst is None or message.id not in burst.messages:
+            return False
+        burst.messages[message.id] = message
+        return True
+
+    async def _flush_later(self, key: Tuple[int, int], delay: float) -> None:
+        await asyncio.sleep(delay)
+        burst = self._bursts.pop(key, None)
+        if burst is None:
+            return
+        for mid in burst.messages:
+            self._where.pop(mid, None)
+        self.on_burst(list(burst.messages.values()))
+
+    def pending(self) -> int:
+        return sum(len(b.messages) for b in self._bursts.values())
+
+    def seen(self, fingerprint: str) -> bool:
+        """True if this content was seen within seen_ttl; otherwise remember it and return False."""
+        now = time.monotonic()
+        while self._seen and (
+            len(self._seen) > self.max_seen or now - next(iter(self._seen.values())) > self.seen_ttl
+        ):
+            self._seen.popitem(last=False)
+        if fingerprint in self._seen:
+            self.duplicates += 1
+            return True
+        self._seen[fingerprint] = now
+        return False
+
+    def forget(self, fingerprints: Iterable[str]) -> None:
+        """Un-remember content whose summary failed, so the next copy of it is summarized."""
+        for fp in fingerprints:
+            self._seen.pop(fp, None)
+
+    async def join(self, poll: float = 0.05) -> None:
+        """Wait until every pending burst has been handed off."""
+        while self._bursts:
+            await asyncio.sleep(poll)
+
+    def close(self) -> None:
+        for burst in self._bursts.values():
+            if burst.timer is not None:
+                burst.timer.cancel()
+        self._bursts.clear()
+        self._where.clear()
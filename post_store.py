@@ -0,0 +1,180 @@
+"""
+Single local store for scraped X posts (SQLite in WAL mode).
+
+Replaces the per-handle {handle}.jsonl files: rows are deduplicated by tweet
+id and indexed by (handle, created_at), so reading "the last 24h for @x" is
+one indexed range query instead of parsing a whole file. The scraper writes
+each handle's new Posts in one transaction; the bot only reads.
+
+Old JSONL lines carry no tweet id, so they are stored under a "legacy:"
+id; when the scraper later stores the same tweet under its real id (same
+handle, text and second), the legacy copy is dropped so no post shows twice.
+
+One-time import of the old JSONL files:
+
+    python post_store.py import
+"""
+from __future__ import annotations
+
+import datetime as dt
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from posts import Post
+
+STORE_FILE = Path(__file__).parent / "posts.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    tweet_id   TEXT PRIMARY KEY,
+    handle     TEXT NOT NULL,
+    created_at REAL NOT NULL,          -- unix seconds, UTC
+    content    TEXT NOT NULL,
+    is_reply   INTEGER NOT NULL,
+    is_retweet INTEGER NOT NULL,
+    is_quote   INTEGER NOT NULL,
+    outlinks   TEXT NOT NULL,          -- JSON list
+    media      TEXT NOT NULL           -- JSON list of urls
+);
+CREATE INDEX IF NOT EXISTS posts_handle_created ON posts(handle, created_at);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+LEGACY_PREFIX = "legacy:"
+_DROP_LEGACY_COPY = (
+    "DELETE FROM posts WHERE tweet_id LIKE 'legacy:%' AND handle = ? AND content = ? "
+    "AND created_at BETWEEN ? - 1 AND ? + 1"
+)
+_DROP_ALL_LEGACY_COPIES = """
+DELETE FROM posts WHERE tweet_id LIKE 'legacy:%' AND EXISTS (
+    SELECT 1 FROM posts AS real
+    WHERE real.handle = posts.handle AND real.content = posts.content
+      AND real.created_at BETWEEN posts.created_at - 1 AND posts.created_at + 1
+      AND real.tweet_id NOT LIKE 'legacy:%'
+)
+"""
+
+
+def _row(post: Post) -> tuple:
+    return (
+        post.id,
+        post.handle,
+        post.created_at,
+        post.text,
+        int(post.is_reply),
+        int(post.is_retweet),
+        int(post.is_quote),
+        json.dumps(post.links, ensure_ascii=False),
+        json.dumps(post.media_urls, ensure_ascii=False),
+    )
+
+
+class PostStore:
+    def __init__(self, path: Path = STORE_FILE):
+        self.path = Path(path)
+        # shared by the bot loop and (optionally) the scraper worker thread
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    # --- writes ---
+    def add_posts(self, posts: Iterable[Post]) -> int:
+        """Bulk-insert posts in one transaction (replacing legacy copies of them); returns rows added."""
+        posts = list(posts)
+        if not posts:
+            return 0
+        real = [(p.handle, p.text, p.created_at, p.created_at) for p in posts if not p.id.startswith(LEGACY_PREFIX)]
+        with self._lock, self._db:
+            if real:
+                self._db.executemany(_DROP_LEGACY_COPY, real)
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", [_row(p) for p in posts]
+            )
+            return self._db.total_changes - before
+
+    def prune(self, before: dt.datetime) -> int:
+        with self._lock, self._db:
+            cur = self._db.execute("DELETE FROM posts WHERE created_at < ?", (before.timestamp(),))
+            return cur.rowcount
+
+    # --- reads ---
+    def posts_since(self, handle: str, since: dt.datetime, originals_only: bool = True) -> List[Post]:
+        """
+        Posts for `handle` created at/after `since`, newest first (timeline
+        order); originals_only drops replies and retweets.
+        """
+        sql = (
+            "SELECT tweet_id, created_at, content, outlinks, media, is_reply, is_retweet, is_quote "
+            "FROM posts WHERE handle = ? AND created_at >= ?"
+        )
+        if originals_only:
+            sql += " AND is_reply = 0 AND is_retweet = 0"
+        sql += " ORDER BY created_at DESC"
+        with self._lock:
+            rows = self._db.execute(sql, (handle, since.timestamp())).fetchall()
+        return [
+            Post(tid, handle, ts, content, json.loads(links), json.loads(media),
+                 bool(is_reply), bool(is_retweet), bool(is_quote))
+            for tid, ts, content, links, media, is_reply, is_retweet, is_quote in rows
+        ]
+
+    # --- one-time JSONL import ---
+    def import_jsonl_dir(self, folder: Path, force: bool = False) -> int:
+        """Import every {handle}.jsonl in `folder` (once, unless force=True)."""
+        with self._lock:
+            done = self._db.execute("SELECT value FROM meta WHERE key = 'jsonl_imported'").fetchone()
+        if done and not force:
+            return 0
+        added = 0
+        for path in sorted(Path(folder).glob("*.jsonl")):
+            records = []
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+            if records and "content" in records[0]:  # skip unrelated .jsonl files
+                posts = (Post.from_record(path.stem, rec) for rec in records)
+                added += self.add_posts(p for p in posts if p)
+        with self._lock, self._db:
+            # a forced re-import after scraping: the scraped rows win
+            added -= self._db.execute(_DROP_ALL_LEGACY_COPIES).rowcount
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('jsonl_imported', ?)",
+                (dt.datetime.now(dt.timezone.utc).isoformat(),),
+            )
+        if added:
+            print(f"📥 imported {added} posts from JSONL into {self.path.name}")
+        return added
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_default: Optional[PostStore] = None
+
+def default_store() -> PostStore:
+    """Process-wide store next to the bot, importing old JSONL files on first open."""
+    global _default
+    if _default is None:
+        _default = PostStore(STORE_FILE)
+        _default.import_jsonl_dir(STORE_FILE.parent)
+    return _default
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:2] == ["import"]:
+        n = PostStore(STORE_FILE).import_jsonl_dir(STORE_FILE.parent, force=True)
+        print(f"done: {n} new posts")
+    else:
+        print(__doc__)
@@ -0,0 +1,69 @@
+"""
+The one in-memory shape of a scraped X post.
+
+The scraper builds Posts straight from twikit tweets, the post store
+writes and reads them, and every digest stage (relevance, story dedup,
+compaction, summaries, sections) takes them as they are. slots=True keeps
+each instance small (no per-object __dict__) for long histories.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass(slots=True)
+class Post:
+    id: str
+    handle: str
+    created_at: float                  # unix seconds, UTC
+    text: str
+    links: List[str] = field(default_factory=list)
+    media_urls: List[str] = field(default_factory=list)
+    is_reply: bool = False
+    is_retweet: bool = False
+    is_quote: bool = False
+
+    @property
+    def created(self) -> dt.datetime:
+        return dt.datetime.fromtimestamp(self.created_at, dt.timezone.utc)
+
+    @property
+    def urls(self) -> List[str]:
+        """Text links, then media."""
+        return self.links + self.media_urls
+
+    @classmethod
+    def from_record(cls, handle: str, rec: Dict[str, Any]) -> Optional["Post"]:
+        """A legacy snscrape-style JSONL line ({handle}.jsonl files); None without a usable date."""
+        try:
+            created = dt.datetime.fromisoformat(str(rec.get("date")).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if created.tzinfo is None:
+            return None
+        content = rec.get("content") or ""
+        tweet_id = rec.get("id")
+        if not tweet_id:
+            # legacy JSONL lines have no id: derive a stable one from the content
+            raw = f"{handle}|{rec.get('date')}|{content}".encode("utf-8")
+            tweet_id = "legacy:" + hashlib.sha1(raw).hexdigest()[:16]
+        media: List[str] = []
+        for m in rec.get("media") or []:
+            if isinstance(m, dict):
+                u = m.get("fullUrl") or m.get("thumbnailUrl") or m.get("url")
+                if u:
+                    media.append(u)
+        return cls(
+            id=str(tweet_id),
+            handle=handle,
+            created_at=created.timestamp(),
+            text=content,
+            links=[u for u in (rec.get("outlinks") or []) if isinstance(u, str)],
+            media_urls=media,
+            is_reply=rec.get("inReplyToTweetId") is not None,
+            is_retweet=rec.get("retweetedTweet") is not None,
+            is_quote=rec.get("quotedTweet") is not None,
+        )
@@ -0,0 +1,113 @@
+"""
+Prompt compaction: bounded, predictable Kimi inputs however much KOLs post.
+
+clean_text() strips boilerplate (t.co short links, repeated and trailing
+hashtag runs, whitespace runs). compact_posts() cleans a feed, collapses
+duplicate posts, and if it is still over `budget` tokens keeps the most
+useful ones first (originals before quotes, newer before older) and
+returns them in their original order. compact_texts() does the same for
+plain text pieces given in priority order (news bursts, shared stories).
+Token counts use tokens.estimate_tokens, so nothing is downloaded.
+"""
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from news_coalescer import normalize_text
+from posts import Post
+from tokens import estimate_tokens, CHARS_PER_TOKEN
+
+_TCO = re.compile(r"https?://t\.co/\w+")
+_HASHTAG = re.compile(r"#\w+")
+_TRAILING_TAGS = re.compile(r"(?:\s*#\w+){3,}\s*$")
+_SPACES = re.compile(r"[ \t\u00a0]+")
+_BLANK_LINES = re.compile(r"\s*\n\s*")
+MAX_TRAILING_TAGS = 2
+
+
+@dataclass
+class Compacted:
+    text: str
+    tokens_in: int
+    tokens_out: int
+    kept: int = 0
+    duplicates: int = 0
+    dropped: int = 0   # pieces left out (or cut) to fit the budget
+
+    @property
+    def saved(self) -> int:
+        return max(0, self.tokens_in - self.tokens_out)
+
+
+def clean_text(text: str) -> str:
+    text = _TCO.sub(" ", text or "")
+    seen = set()
+
+    def first_tag_only(m: "re.Match") -> str:
+        tag = m.group(0).lower()
+        if tag in seen:
+            return ""
+        seen.add(tag)
+        return m.group(0)
+
+    text = _HASHTAG.sub(first_tag_only, text)
+    tail = _TRAILING_TAGS.search(text)
+    if tail:
+        text = text[: tail.start()] + " " + " ".join(_HASHTAG.findall(tail.group(0))[:MAX_TRAILING_TAGS])
+    text = _BLANK_LINES.sub("\n", _SPACES.sub(" ", text))
+    return text.strip()
+
+
+def _fit(pieces: List[Tuple[int, str]], budget: int, sep: str) -> Tuple[List[Tuple[int, str]], int]:
+    """Take (position, text) pieces in the given order while they fit; the first one is cut if it must be."""
+    chosen: List[Tuple[int, str]] = []
+    used, dropped = 0, 0
+    for pos, text in pieces:
+        cost = estimate_tokens(text + sep)
+        if budget > 0 and used + cost > budget:
+            room = (budget - used) * CHARS_PER_TOKEN - len(sep)
+            if chosen or room < 80:
+                dropped += 1
+                continue
+            text = text[:room].rsplit(" ", 1)[0] + " …"
+            cost = estimate_tokens(text + sep)
+            dropped += 1
+        chosen.append((pos, text))
+        used += cost
+    return sorted(chosen), dropped
+
+
+def compact_texts(texts: Iterable[str], budget: int, sep: str = "\n\n", priority: Optional[List[int]] = None) -> Compacted:
+    """
+    Clean texts and drop duplicates, then keep them within `budget` tokens
+    (0 = no cap), taking indexes in `priority` order (default: as given).
+    Kept texts come back in their original order.
+    """
+    texts = list(texts)
+    tokens_in = estimate_tokens(sep.join(texts))
+    seen = set()
+    pieces: List[Tuple[int, str]] = []
+    duplicates = 0
+    for pos in priority if priority is not None else range(len(texts)):
+        t = clean_text(texts[pos])
+        key = normalize_text(t)
+        if not key:
+            continue
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        pieces.append((pos, t))
+    chosen, dropped = _fit(pieces, budget, sep)
+    text = sep.join(t for _, t in chosen)
+    return Compacted(text, tokens_in, estimate_tokens(text), len(chosen), duplicates, dropped)
+
+
+def compact_posts(posts: List[Post], budget: int, sep: str = "\n\n") -> Compacted:
+    """
+    Feed posts (newest first, as the post store returns them) joined for a
+    prompt within `budget` tokens. Over budget, originals win over quotes
+    and newer posts over older ones.
+    """
+    priority = sorted(range(len(posts)), key=lambda i: (posts[i].is_quote, i))
+    return compact_texts([p.text.strip() for p in posts], budget, sep, priority)
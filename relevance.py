@@ -0,0 +1,118 @@
+"""
+Local relevance ranking of KOL posts against a Bittensor / subnet / TAO vocabulary.
+
+All posts of a digest run are scored in one NumPy batch. Each post becomes
+unigram + bigram features (words, plus the hosts of its links), with words
+numbered per batch so a vocabulary match is exact and the same in every
+process, weighted by sublinear TF x IDF computed over the batch. Its score is the
+TF-IDF weight on vocabulary terms divided by log2(2 + words): 0 = no
+vocabulary term at all, and one mention in a long thread still scores
+well above 0 (a share of the whole post's weight would not). select_relevant()
+keeps each handle's top-K posts that mention the vocabulary and score
+at least `min_score`. No network, no model; thousands of posts score in
+milliseconds.
+"""
+import re
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+import numpy as np
+
+from posts import Post
+
+VOCABULARY = (
+    "bittensor tao dtao subnet subnets netuid validator validators miner miners mining "
+    "emission emissions incentive incentives yuma consensus weights alpha staking stake staked "
+    "root registration dereg deregistration halving taostats opentensor otf subtensor "
+    "metagraph btcli chutes templar ridges targon dojo macrocosmos rayon corcel nineteen "
+    "inference tokenomics burn unstake delegate delegation mainnet testnet"
+).split() + [
+    "decentralized ai", "subnet owner", "root network", "alpha token", "dynamic tao", "tao flow",
+    "emission schedule", "validator take", "subnet registration", "proof of intelligence",
+]
+
+_URL = re.compile(r"https?://(?:www\.)?([^/?#\s\x00]+)[^\s\x00]*")
+_SUBNET_TAG = re.compile(r"\bsn\d{1,3}\b")
+_WORD = re.compile(r"[^\W_]+|\x00")  # \x00 separates posts
+_SEP = "\x00"
+
+Vocabulary = Tuple[FrozenSet[str], FrozenSet[Tuple[str, str]]]
+
+
+def _host_words(m: "re.Match") -> str:
+    # a link counts by its site ("taostats.io/..." -> "taostats"); X links say nothing
+    parts = m.group(1).split(".")[:-1]
+    return " " + " ".join(p for p in parts if p not in ("x", "twitter", "t")) + " "
+
+
+def _corpus(posts: List[Post]) -> str:
+    texts = [p.text + " " + " ".join(p.links) for p in posts]
+    text = _SEP.join(t.replace(_SEP, " ") for t in texts).lower()
+    return _SUBNET_TAG.sub(" subnet ", _URL.sub(_host_words, text))
+
+
+def vocabulary(extra_terms: Iterable[str] = ()) -> Vocabulary:
+    """(words, word pairs) that make a post on-topic; longer phrases count through their pairs."""
+    words, pairs = set(), set()
+    for term in list(VOCABULARY) + [t.strip().lower() for t in extra_terms if t.strip()]:
+        parts = term.split()
+        if len(parts) == 1:
+            words.add(parts[0])
+        pairs.update(zip(parts, parts[1:]))
+    return frozenset(words), frozenset(pairs)
+
+
+def score_posts(posts: List[Post], vocab: Vocabulary) -> np.ndarray:
+    """Relevance >= 0 for every post (text + link hosts), as one float array; 0 = off-topic."""
+    n = len(posts)
+    if not n:
+        return np.zeros(0)
+    # one regex pass over the whole batch; every distinct word gets the next id, posts split on the separator
+    words = _WORD.findall(_corpus(posts))
+    ids: Dict[str, int] = {_SEP: 0}
+    h = np.fromiter((ids.setdefault(w, len(ids)) for w in words), dtype=np.int64, count=len(words))
+    sep = h == 0
+    doc = np.cumsum(sep)[~sep]
+    h = h[~sep]
+    if not len(h):
+        return np.zeros(n)
+    v = len(ids)
+    same_doc = doc[:-1] == doc[1:]
+    bigrams = v + h[:-1][same_doc] * v + h[1:][same_doc]  # ids v .. v*(v+1) - 1, after the unigrams
+    rows = np.concatenate([doc, doc[:-1][same_doc]])
+    cols = np.concatenate([h, bigrams])
+
+    keys, tf = np.unique(rows * (v * (v + 1)) + cols, return_counts=True)
+    r, c = np.divmod(keys, v * (v + 1))
+    _, col, df = np.unique(c, return_inverse=True, return_counts=True)
+    idf = np.log((1 + n) / (1 + df[col])) + 1.0
+    w = (1.0 + np.log(tf)) * idf
+    unigrams, pairs = vocab
+    wanted = [ids[t] for t in unigrams if t in ids]
+    wanted += [v + ids[a] * v + ids[b] for a, b in pairs if a in ids and b in ids]
+    on_topic = np.bincount(r, weights=w * np.isin(c, wanted), minlength=n)
+    # damped by length, not divided by it: a long on-topic post keeps a score
+    return on_topic / np.log2(2 + np.bincount(doc, minlength=n))
+
+
+def select_relevant(
+    posts_by_handle: Dict[str, List[Post]],
+    top_k: int = 12,
+    min_score: float = 0.0,
+    extra_terms: Iterable[str] = (),
+) -> Tuple[Dict[str, List[Post]], int]:
+    """
+    Each handle's top_k posts (0 = no limit) that mention the vocabulary and
+    score at least min_score, in their original order. Returns (kept posts
+    by handle, posts dropped).
+    """
+    flat = [(h, i, p) for h, posts in posts_by_handle.items() for i, p in enumerate(posts)]
+    scores = score_posts([p for _, _, p in flat], vocabulary(extra_terms))
+    ranked: Dict[str, List[Tuple[float, int]]] = {h: [] for h in posts_by_handle}
+    for (h, i, _), s in zip(flat, scores.tolist()):
+        if s > 0 and s >= min_score:
+            ranked[h].append((s, i))
+    kept: Dict[str, List[Post]] = {}
+    for h, candidates in ranked.items():
+        best = sorted(candidates, key=lambda si: (-si[0], si[1]))[: top_k or None]
+        kept[h] = [posts_by_handle[h][i] for i in sorted(i for _, i in best)]
+    return kept, len(flat) - sum(len(v) for v in kept.values())
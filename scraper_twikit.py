@@ -3,16 +3,15 @@ from __future__ import annotations
 import json
 import datetime as dt
 from pathlib import Path
-from typing import Any, Dict, List
-from twikit import Client
+from typing import Any, Dict, List, Optional, Tuple
 import asyncio
-import random
-
-async def human_pause(lo=3.0, hi=8.0):
-    s = random.uniform(lo, hi)
-    print(f"⏳ human pause {s:.1f}s")
-    await asyncio.sleep(s)
+import os
 
+from post_store import PostStore, default_store
+from posts import Post
+from kols import KOL_HANDLES
+import random
+import time
 
 def _get_created_dt(t):
     import datetime as dt
@@ -39,15 +38,41 @@ def _get_created_dt(t):
 
 COOKIES_FILE = "cookies.json"
 
-KOL_HANDLES: List[str] = [
-    "TAOTemplar","JosephJacks_","jaltucher","KeithSingery","SiamKidd","markjeffrey",
-    "Taotreasuries","here4impact","SubnetStats","mogmachine","const_reborn","shibshib89",
-    "Old_Samster","bittingthembits","badenglishtea","learnbittensor","Obsessedfan5",
-]
-
 MAX_SCAN_PER_HANDLE = 60
 OUT_DIR = Path(__file__).parent
 
+# shared request budget for all handles (every twikit call costs one token)
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "4"))
+SCRAPE_RATE_PER_MIN = float(os.getenv("SCRAPE_RATE_PER_MIN", "30"))
+SCRAPE_BURST = int(os.getenv("SCRAPE_BURST", "4"))
+SCRAPE_JITTER = float(os.getenv("SCRAPE_JITTER", "1.0"))  # max extra random delay per request (s)
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens/second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: int, jitter: float = 0.0):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.jitter = jitter
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+        if self.jitter:
+            # small random spread so requests don't land on a perfect metronome
+            await asyncio.sleep(random.uniform(0, self.jitter))
+
 def utcnow() -> dt.datetime:
     return dt.datetime.now(dt.timezone.utc)
 
@@ -82,9 +107,14 @@ def to_iso8601_utc(d: dt.datetime | None) -> str | None:
         d = d.replace(tzinfo=dt.timezone.utc)
     return d.astimezone(dt.timezone.utc).isoformat()
 
-def tweet_to_jsonl_record(t: Any) -> Dict[str, Any]:
+def tweet_to_post(handle: str, t: Any) -> Post | None:
+    """A twikit tweet as a Post; None if it has no creation time."""
     text = getattr(t, "full_text", None) or getattr(t, "text", "") or ""
     created_dt = get_created_at_dt(t)
+    if created_dt is None:
+        return None
+    if created_dt.tzinfo is None:
+        created_dt = created_dt.replace(tzinfo=dt.timezone.utc)
 
     is_rt = bool(getattr(t, "is_retweet", False))
     is_reply = bool(getattr(t, "is_reply", False)) or (getattr(t, "in_reply_to_status_id", None) is not None)
@@ -109,66 +139,189 @@ def tweet_to_jsonl_record(t: Any) -> Dict[str, Any]:
             if url:
                 media_urls.append(url)
 
-    return {
-        "content": text,
-        "date": to_iso8601_utc(created_dt),
-        "retweetedTweet": {} if is_rt else None,
-        "inReplyToTweetId": "x" if is_reply else None,
-        "quotedTweet": {} if is_quote else None,
-        "outlinks": links,
-        "media": [{"fullUrl": u} for u in media_urls],
-    }
-import sys
-print("PYTHON:", sys.executable)
-print("SCRAPER FILE:", __file__)
-
-async def run_once() -> int:
-    client = Client(language="en-US")
-    client.load_cookies(COOKIES_FILE)
-    print("🍪 cookies loaded")
+    return Post(
+        id=str(getattr(t, "id", "")),
+        handle=handle,
+        created_at=created_dt.timestamp(),
+        text=text,
+        links=links,
+        media_urls=media_urls,
+        is_reply=is_reply,
+        is_retweet=is_rt,
+        is_quote=is_quote,
+    )
 
-    since = utcnow() - dt.timedelta(hours=24)
-    total_written = 0
+# --- engine: importable by bot.py, runnable standalone ---
+# Any object with twikit's `get_user_by_screen_name` / `get_user_tweets`
+# coroutines can be passed as `client` (e.g. a local fake for benchmarks).
+_default_client: Any = None
+_client_loop: Any = None  # loop the twikit client was built on (None = injected client, reused anywhere)
 
-    for handle in KOL_HANDLES:
-        await human_pause(3, 8)
-        try:
-            user = await client.get_user_by_screen_name(handle)
-            items = await client.get_user_tweets(user.id, "Tweets")
-
-            out: List[Dict[str, Any]] = []
-            scanned = 0
-            for t in items:
-                scanned += 1
-                created = get_created_at_dt(t)
-                if created and created >= since:
-                    out.append(tweet_to_jsonl_record(t))
-                    print(f"{handle} posted at {created}, since={since}")
-
-                if scanned >= MAX_SCAN_PER_HANDLE:
-                    break
+def make_client() -> Any:
+    """
+    Build a cookie-authenticated twikit client, once per event loop: its
+    HTTP pool is bound to the loop it was created on, and with
+    SCRAPER_IN_WORKER=1 every run gets a fresh loop.
+    """
+    global _default_client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _default_client is None or (_client_loop is not None and _client_loop is not loop):
+        from twikit import Client  # imported lazily so fake clients don't need twikit
+        client = Client(language="en-US")
+        client.load_cookies(COOKIES_FILE)
+        print("🍪 cookies loaded")
+        _default_client, _client_loop = client, loop
+    return _default_client
 
-            if out:
-                path = OUT_DIR / f"{handle}.jsonl"
-                with path.open("w", encoding="utf-8") as f:
-                    for rec in out:
-                        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
-                total_written += 1
-                print(f"✅ {handle}: wrote {len(out)} items")
-            else:
-                print(f"- {handle}: nothing in last 24h")
 
+# --- incremental state: per-handle high-water mark + cached user ids ---
+STATE_FILE = OUT_DIR / "scrape_state.json"
+POST_RETENTION_DAYS = int(os.getenv("POST_RETENTION_DAYS", "30"))  # history kept in posts.sqlite3
 
-        except Exception as e:
-            print(f"❌ {handle}: scrape error: {e!r}")
-        finally:
-            await human_pause(4, 12)
+def load_state() -> Dict[str, Dict[str, Any]]:
+    try:
+        with STATE_FILE.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-    print(f"📦 done. wrote files for {total_written} handles")
-    return 0
+def save_state(state: Dict[str, Dict[str, Any]]) -> None:
+    tmp = STATE_FILE.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    tmp.replace(STATE_FILE)
 
-if __name__ == "__main__":
-    import asyncio
-    asyncio.run(run_once())
+def tweet_id_key(tid: Any) -> int:
+    """Tweet ids are snowflakes: numerically larger = newer."""
+    try:
+        return int(tid)
+    except (TypeError, ValueError):
+        return -1
 
 
+def prune_store(store: PostStore, days: int = POST_RETENTION_DAYS) -> int:
+    return store.prune(utcnow() - dt.timedelta(days=days))
+
+
+# per-handle wall time (seconds) of the most recent run_once
+last_run_latency: Dict[str, float] = {}
+
+
+async def scrape_handle(
+    client: Any, handle: str, since: dt.datetime, bucket: TokenBucket, hs: Dict[str, Any]
+) -> Tuple[List[Post], Dict[str, Any]]:
+    """
+    Return (posts, new_mark): only tweets newer than the handle's high-water
+    mark (hs) and the 24h cutoff. The timeline is newest-first, so we stop
+    at the first tweet we've already seen or that is too old, and only page
+    with the cursor when a whole batch was new. new_mark ({} if unchanged)
+    goes into `hs` only once the posts are stored; the cached user id is
+    set in place.
+    """
+    user_id = hs.get("user_id")
+    if not user_id:
+        await bucket.acquire()
+        user = await client.get_user_by_screen_name(handle)
+        user_id = hs["user_id"] = str(user.id)
+
+    hwm = tweet_id_key(hs.get("newest_id"))
+    await bucket.acquire()
+    items = await client.get_user_tweets(user_id, "Tweets")
+
+    out: List[Post] = []
+    scanned = 0
+    done = False
+    while items and not done:
+        for t in items:
+            scanned += 1
+            created = get_created_at_dt(t)
+            seen = hwm >= 0 and tweet_id_key(getattr(t, "id", None)) <= hwm
+            too_old = created is not None and created < since
+            if seen or too_old:
+                if scanned == 1:
+                    continue  # probably a pinned tweet; keep looking
+                done = True
+                break
+            post = tweet_to_post(handle, t)
+            if post is not None:
+                out.append(post)
+                print(f"{handle} posted at {created}, since={since}")
+
+            if scanned >= MAX_SCAN_PER_HANDLE:
+                done = True
+                break
+
+        if done or not hasattr(items, "next"):
+            break
+        await bucket.acquire()
+        items = await items.next()
+
+    mark: Dict[str, Any] = {}
+    if out:
+        newest = max(out, key=lambda p: tweet_id_key(p.id))
+        if tweet_id_key(newest.id) > hwm:
+            mark = {"newest_id": newest.id, "newest_at": to_iso8601_utc(newest.created)}
+    return out, mark
+
+
+async def run_once(
+    handles: Optional[List[str]] = None,
+    client: Any = None,
+    store: Optional[PostStore] = None,
+    bucket: Optional[TokenBucket] = None,
+    concurrency: int = SCRAPE_CONCURRENCY,
+) -> Dict[str, int]:
+    """
+    Scrape each handle incrementally and return {handle: new posts stored}.
+    Up to `concurrency` handles are fetched at once; every request draws from
+    one shared token bucket, so total time tracks the rate budget rather
+    than a sum of per-handle sleeps. Handles that errored are left out.
+    New posts are bulk-inserted into the post store (posts.sqlite3), one
+    transaction per handle; readers query the store for the 24h window.
+    """
+    client = client or make_client()
+    store = store or default_store()
+    handles = KOL_HANDLES if handles is None else handles
+    bucket = bucket or TokenBucket(SCRAPE_RATE_PER_MIN / 60.0, SCRAPE_BURST, SCRAPE_JITTER)
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    since = utcnow() - dt.timedelta(hours=24)
+    written: Dict[str, int] = {}
+    state = load_state()
+    last_run_latency.clear()
+
+    async def one(handle: str) -> None:
+        async with sem:
+            started = time.monotonic()
+            try:
+                hs = state.setdefault(handle, {})
+                out, mark = await scrape_handle(client, handle, since, bucket, hs)
+                written[handle] = store.add_posts(out)
+                hs.update(mark)  # only advance past tweets that are safely in the store
+                if out:
+                    print(f"✅ {handle}: wrote {len(out)} new items")
+                else:
+                    print(f"- {handle}: nothing new")
+            except Exception as e:
+                print(f"❌ {handle}: scrape error: {e!r}")
+            finally:
+                last_run_latency[handle] = time.monotonic() - started
+
+    run_started = time.monotonic()
+    await asyncio.gather(*(one(h) for h in handles))
+    save_state(state)
+    prune_store(store)
+
+    total_written = sum(1 for n in written.values() if n)
+    slowest = max(last_run_latency.items(), key=lambda kv: kv[1], default=(None, 0.0))
+    print(
+        f"📦 done. stored new posts for {total_written} handles in {time.monotonic() - run_started:.1f}s"
+        + (f" (slowest: {slowest[0]} {slowest[1]:.1f}s)" if slowest[0] else "")
+    )
+    return written
+
+if __name__ == "__main__":
+    import sys
+    print("PYTHON:", sys.executable)
+    print("SCRAPER FILE:", __file__)
+    asyncio.run(run_once())
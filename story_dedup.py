@@ -0,0 +1,162 @@
+"""
+Cross-KOL story detection for the digest.
+
+Posts are reduced to sets of word k-shingles over normalized text. An
+inverted index (shingle -> posts) finds candidate pairs without comparing
+every post with every other; shingles shared by more than `max_df` posts
+are boilerplate and skipped. Pairs at or above `threshold` Jaccard
+similarity are merged with union-find, and so are posts by different KOLs
+linking the same canonical URL whose texts share at least `url_overlap` of
+their words. Homepages, URLs carried by more than `max_url_df` posts and
+URLs one KOL links from `own_link_posts` posts or more (their own site)
+don't count as a shared link.
+Clusters that span at least `min_handles` KOLs become Stories: summarized
+once and referenced from each handle's section. Roughly linear in the
+number of posts, so thousands a day are fine.
+"""
+import hashlib
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+from urllib.parse import urlsplit
+
+from links import canonicalize
+from news_coalescer import normalize_text
+from posts import Post
+
+SHINGLE_WORDS = 5
+# per-post media and profile links say nothing about the story
+_IGNORED_URL_PARTS = ("pbs.twimg.com", "video.twimg.com", "cdn.discordapp.com")
+
+
+@dataclass
+class Story:
+    key: str                                   # stable across runs for the same posts
+    handles: List[str]                         # in first-seen order
+    posts: List[Post] = field(default_factory=list)
+    urls: List[str] = field(default_factory=list)
+    label: str = ""                            # "S1", "S2", ... assigned in digest order
+
+    def texts(self) -> List[str]:
+        """Distinct post texts, longest first (copies of the same text appear once)."""
+        seen: Set[str] = set()
+        out: List[str] = []
+        for p in sorted(self.posts, key=lambda p: -len(p.text)):
+            t = p.text.strip()
+            n = normalize_text(t)
+            if t and n not in seen:
+                seen.add(n)
+                out.append(t)
+        return out
+
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> Set[int]:
+    words = normalize_text(text).split()
+    if len(words) < k:
+        return {hash(" ".join(words))} if words else set()
+    return {hash(" ".join(words[i:i + k])) for i in range(len(words) - k + 1)}
+
+
+def content_words(text: str) -> Set[str]:
+    return {w for w in normalize_text(text).split() if len(w) > 3}
+
+
+def is_homepage(url: str) -> bool:
+    parts = urlsplit(url)
+    return parts.path in ("", "/") and not parts.query
+
+
+def story_urls(post: Post) -> List[str]:
+    # canonical: the same article shared with different utm tags or via twitter.com vs x.com still matches
+    return [canonicalize(u) for u in post.links if u and not any(x in u for x in _IGNORED_URL_PARTS)]
+
+
+def find_shared_stories(
+    posts_by_handle: Dict[str, List[Post]],
+    threshold: float = 0.5,
+    min_handles: int = 2,
+    max_df: int = 200,
+    url_overlap: float = 0.2,
+    max_url_df: int = 20,
+    own_link_posts: int = 3,
+) -> List[Story]:
+    docs: List[Tuple[str, Post]] = [(h, p) for h, posts in posts_by_handle.items() for p in posts]
+    parent = list(range(len(docs)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i: int, j: int) -> None:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    # near-duplicate text: inverted index over shingles, exact Jaccard on candidates
+    sigs = [shingles(p.text) for _, p in docs]
+    index: Dict[int, List[int]] = defaultdict(list)
+    for i, sig in enumerate(sigs):
+        overlap: Counter = Counter()
+        for s in sig:
+            ids = index[s]
+            if len(ids) < max_df:
+                overlap.update(ids)
+            ids.append(i)
+        for j, shared in overlap.items():
+            if shared / (len(sig) + len(sigs[j]) - shared) >= threshold:
+                union(i, j)
+
+    # same canonical link from different KOLs, saying something alike = same story
+    by_url: Dict[str, List[int]] = defaultdict(list)
+    for i, (_, p) in enumerate(docs):
+        for u in dict.fromkeys(story_urls(p)):
+            by_url[u].append(i)
+    words: Dict[int, Set[str]] = {}
+    for u, ids in by_url.items():
+        if len(ids) < 2 or len(ids) > max_url_df or is_homepage(u):
+            continue
+        if max(Counter(docs[i][0] for i in ids).values()) >= own_link_posts:
+            continue
+        for a, i in enumerate(ids):
+            for j in ids[a + 1:]:
+                if docs[i][0] == docs[j][0]:
+                    continue
+                wi = words.setdefault(i, content_words(docs[i][1].text))
+                wj = words.setdefault(j, content_words(docs[j][1].text))
+                if wi and wj and len(wi & wj) / min(len(wi), len(wj)) >= url_overlap:
+                    union(i, j)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for i in range(len(docs)):
+        groups[find(i)].append(i)
+
+    stories: List[Story] = []
+    for members in groups.values():
+        handles = list(dict.fromkeys(docs[i][0] for i in members))
+        if len(handles) < min_handles:
+            continue
+        posts = [docs[i][1] for i in members]
+        urls = list(dict.fromkeys(u for p in posts for u in story_urls(p)))
+        raw = "\n".join(sorted(normalize_text(p.text) for p in posts)) + "\n" + "\n".join(sorted(urls))
+        stories.append(Story(hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16], handles, posts, urls))
+    return stories
+
+
+def split_shared_stories(
+    posts_by_handle: Dict[str, List[Post]], **kwargs
+) -> Tuple[List[Story], Dict[str, List[Post]], Dict[str, List[Story]]]:
+    """
+    Returns (stories, own_posts, stories_by_handle): own_posts keeps each
+    handle's posts that are not part of a shared story (possibly empty).
+    """
+    stories = find_shared_stories(posts_by_handle, **kwargs)
+    in_story = {id(p) for s in stories for p in s.posts}
+    own_posts = {h: [p for p in posts if id(p) not in in_story] for h, posts in posts_by_handle.items()}
+    stories_by_handle: Dict[str, List[Story]] = defaultdict(list)
+    for n, story in enumerate(stories, 1):
+        story.label = f"S{n}"
+        for h in story.handles:
+            stories_by_handle[h].append(story)
+    return stories, own_posts, dict(stories_by_handle)
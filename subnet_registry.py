@@ -0,0 +1,207 @@
+"""
+Subnet registry: netuid / alias -> name and output channel, for every subnet.
+
+Entries come from three layers, later ones winning:
+  1. the defaults passed in (bot.py's SUBNET_CHANNELS, "name-netuid": channel_id)
+  2. subnets.json, hand-edited or written by `python subnet_registry.py init`:
+       {"subnets": [{"netuid": 62, "name": "ridges", "channel_id": 1409..., "aliases": ["ridges-ai"]}]}
+  3. subnet_channels.json, channels the bot created on demand (netuid -> channel_id)
+Netuids 0..count-1 missing from all three get a placeholder "subnet-N" entry,
+so every subnet routes. Lookups are dict hits by netuid or lower-cased alias
+(name, "name-netuid" label, extra aliases). subnets.json is re-read when its
+mtime changes, checked at most every `check_interval` seconds.
+
+SUBNET_TOKEN is what a TLDR request is addressed with ("62", "62-",
+"ridges", "ridges-62"); convo_text() is a request's text without it.
+"""
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SUBNETS_FILE = Path(__file__).parent / "subnets.json"
+CREATED_FILE = Path(__file__).parent / "subnet_channels.json"
+SUBNET_COUNT = int(os.getenv("SUBNET_COUNT", "129"))  # netuids 0..128
+SUBNET_TOKEN = re.compile(r"^\s*(\d{1,3}|[A-Za-z][\w.\-]*?)(?:[\s\-\:\.])?$")  # "62", "62-", "ridges", "ridges-62"
+_NUMERIC_PREFIX = re.compile(r"^\s*\d{1,3}[\s\-\:\.]*")
+
+
+def convo_text(content: str) -> str:
+    """A TLDR request's own text: "" when it is only the subnet token, else minus a leading netuid."""
+    content = content or ""
+    if SUBNET_TOKEN.match(content):
+        return ""
+    return _NUMERIC_PREFIX.sub("", content, count=1).strip()
+
+
+@dataclass
+class Subnet:
+    netuid: int
+    name: str
+    channel_id: Optional[int] = None
+    aliases: List[str] = field(default_factory=list)
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}-{self.netuid}"
+
+
+def _parse_label(label: str) -> Optional[Subnet]:
+    name, _, uid = label.rpartition("-")
+    if not name or not uid.isdigit():
+        return None
+    return Subnet(int(uid), name)
+
+
+class SubnetRegistry:
+    def __init__(
+        self,
+        path: Path = SUBNETS_FILE,
+        defaults: Optional[Dict[str, int]] = None,
+        count: int = SUBNET_COUNT,
+        created_path: Path = CREATED_FILE,
+        check_interval: float = 2.0,
+    ):
+        self.path = Path(path)
+        self.defaults = dict(defaults or {})
+        self.count = count
+        self.created_path = Path(created_path)
+        self.check_interval = check_interval
+        self._by_netuid: Dict[int, Subnet] = {}
+        self._by_alias: Dict[str, Subnet] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self.reload()
+
+    # --- loading ---
+    def _read_json(self, path: Path):
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def reload(self) -> bool:
+        """Rebuild the indexes; on a bad file keep the previous ones. Returns True if rebuilt."""
+        by_netuid: Dict[int, Subnet] = {}
+        for label, channel_id in self.defaults.items():
+            sn = _parse_label(label)
+            if sn:
+                sn.channel_id = int(channel_id)
+                by_netuid[sn.netuid] = sn
+        try:
+            self._mtime = self.path.stat().st_mtime if self.path.exists() else None
+            rows = self._read_json(self.path).get("subnets", []) if self._mtime is not None else []
+            for row in rows:
+                uid = int(row["netuid"])
+                prev = by_netuid.get(uid)
+                by_netuid[uid] = Subnet(
+                    netuid=uid,
+                    name=str(row.get("name") or (prev.name if prev else "subnet")),
+                    channel_id=int(row["channel_id"]) if row.get("channel_id") else (prev.channel_id if prev else None),
+                    aliases=[str(a) for a in row.get("aliases") or []],
+                )
+            created = self._read_json(self.created_path) if self.created_path.exists() else {}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"⚠️ {self.path.name} not loaded ({e!r}); keeping {len(self._by_netuid)} subnets")
+            return False
+
+        for uid, channel_id in created.items():
+            sn = by_netuid.get(int(uid))
+            if sn and not sn.channel_id:
+                sn.channel_id = int(channel_id)
+        for uid in range(self.count):
+            by_netuid.setdefault(uid, Subnet(uid, "subnet"))
+
+        names: Dict[str, int] = {}
+        for sn in by_netuid.values():
+            names[sn.name.lower()] = names.get(sn.name.lower(), 0) + 1
+        by_alias: Dict[str, Subnet] = {}
+        for sn in by_netuid.values():
+            bare = [sn.name] if names[sn.name.lower()] == 1 else []  # "subnet" placeholders need the netuid
+            for alias in [sn.label] + bare + sn.aliases:
+                by_alias.setdefault(alias.lower(), sn)
+        self._by_netuid, self._by_alias = by_netuid, by_alias
+        mapped = sum(1 for s in by_netuid.values() if s.channel_id)
+        print(f"🗺️ subnet registry: {len(by_netuid)} subnets, {mapped} with channels")
+        return True
+
+    def maybe_reload(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        return self.reload()
+
+    # --- lookups ---
+    def by_netuid(self, netuid: int) -> Optional[Subnet]:
+        self.maybe_reload()
+        return self._by_netuid.get(int(netuid))
+
+    def lookup(self, token: str) -> Optional[Subnet]:
+        """Subnet for a netuid ("62") or an alias ("ridges", "ridges-62"), else None."""
+        self.maybe_reload()
+        token = (token or "").strip().lower()
+        if token.isdigit():
+            return self._by_netuid.get(int(token))
+        return self._by_alias.get(token)
+
+    def mapped(self) -> Dict[str, int]:
+        """{label: channel_id} for every subnet that has an output channel."""
+        self.maybe_reload()
+        return {s.label: s.channel_id for s in sorted(self._by_netuid.values(), key=lambda s: s.netuid) if s.channel_id}
+
+    def __len__(self) -> int:
+        return len(self._by_netuid)
+
+    # --- channels created on demand ---
+    def remember_channel(self, netuid: int, channel_id: int) -> None:
+        created = {}
+        try:
+            if self.created_path.exists():
+                created = self._read_json(self.created_path)
+        except (OSError, ValueError):
+            pass
+        created[str(netuid)] = int(channel_id)
+        tmp = self.created_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(created, indent=2, sort_keys=True), encoding="utf-8")
+        tmp.replace(self.created_path)
+        sn = self._by_netuid.get(int(netuid))
+        if sn:
+            sn.channel_id = int(channel_id)
+
+
+def write_skeleton(path: Path, defaults: Dict[str, int], count: int = SUBNET_COUNT) -> int:
+    """Write a subnets.json covering netuids 0..count-1 (mapped ones filled in) for editing."""
+    known = {sn.netuid: (sn, channel_id) for sn, channel_id in
+             ((_parse_label(label), channel_id) for label, channel_id in defaults.items()) if sn}
+    rows = []
+    for uid in sorted(set(range(count)) | set(known)):
+        sn, channel_id = known.get(uid, (Subnet(uid, "subnet"), None))
+        rows.append({"netuid": uid, "name": sn.name, "channel_id": channel_id, "aliases": []})
+    path.write_text(json.dumps({"subnets": rows}, indent=2), encoding="utf-8")
+    return len(rows)
+
+
+if __name__ == "__main__":
+    # python subnet_registry.py init   -> subnets.json seeded from bot.py's SUBNET_CHANNELS
+    if sys.argv[1:2] == ["init"]:
+        if SUBNETS_FILE.exists() and "--force" not in sys.argv:
+            sys.exit(f"{SUBNETS_FILE.name} already exists (use --force to overwrite)")
+        import ast
+        src = (Path(__file__).parent / "bot.py").read_text(encoding="utf-8")
+        node = next(
+            n for n in ast.walk(ast.parse(src))
+            if isinstance(n, ast.Assign) and getattr(n.targets[0], "id", None) == "SUBNET_CHANNELS"
+        )
+        n = write_skeleton(SUBNETS_FILE, ast.literal_eval(node.value))
+        print(f"📝 wrote {n} subnets to {SUBNETS_FILE}")
+    else:
+        print("usage: python subnet_registry.py init [--force]")
@@ -0,0 +1,28 @@
+import asyncio
+import gzip
+import tracemalloc
+
+from attachments import AttachmentReader
+from bench.fake_discord import FakeAttachment
+
+
+def test_gz_without_newlines_stops_at_max_chars_with_bounded_memory():
+    data = gzip.compress(b"a" * (60 * 1024 * 1024))
+    reader = AttachmentReader(max_chars=100_000)
+    tracemalloc.start()
+    try:
+        out = asyncio.run(reader.ingest([FakeAttachment("export.gz", data)]))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert out.truncated
+    assert 0 < len(out.text) <= 100_000
+    assert peak < 5 * 1024 * 1024
+
+
+def test_lines_are_normalized_across_chunks():
+    data = "one  line\r\n{Reactions}\n👍 (2)\n\n\n\nsecond line\n".encode()
+    reader = AttachmentReader(chunk_size=3)
+    out = asyncio.run(reader.ingest([FakeAttachment("convo.txt", data)]))
+    assert out.text == "one line\n\nsecond line"
+    assert not out.truncated
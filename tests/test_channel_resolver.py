@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from channel_resolver import ChannelResolver, ChannelUnavailable
+
+
+class Category:
+    id = 7
+    text_channels = []
+
+    async def create_text_channel(self, name, **kwargs):
+        raise NotImplementedError
+
+
+class Client:
+    """Nothing in the gateway cache; every fetch_channel is counted."""
+
+    def __init__(self):
+        self.fetches = 0
+
+    def get_channel(self, channel_id):
+        return None
+
+    async def fetch_channel(self, channel_id):
+        self.fetches += 1
+        await asyncio.sleep(0.01)
+        return Category()
+
+
+def test_category_is_fetched_once_and_never_returned_as_a_destination():
+    async def run():
+        client = Client()
+        resolver = ChannelResolver(client)
+        first, second = await asyncio.gather(
+            resolver.resolve(7, need="create_text_channel"), resolver.resolve(7, need="create_text_channel")
+        )
+        assert first is second
+        assert await resolver.resolve(7, need="create_text_channel") is first
+        with pytest.raises(ChannelUnavailable, match="not a text channel"):
+            await resolver.resolve(7)  # a category can't be sent to
+        assert client.fetches == 1
+
+    asyncio.run(run())
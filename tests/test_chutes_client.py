@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from bench import fake_chutes
+from chutes_client import ChutesClient, CircuitBreaker
+
+
+def half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0)
+    breaker.record_failure()  # open, and with no cooldown the next call is the trial
+    assert breaker.state == "half-open"
+    return breaker
+
+
+def test_cancelled_trial_in_complete_lets_the_next_call_through():
+    async def run():
+        cfg = fake_chutes.FaultConfig(latency=1, jitter=0)
+        runner, url = await fake_chutes.start(cfg)
+        client = ChutesClient(api_token="test", url=url, breaker=half_open_breaker(), max_retries=0)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.complete("hello"), timeout=0.1)
+            cfg.latency = 0
+            assert await client.complete("hello")
+            assert client.breaker.state == "closed"
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_abandoned_trial_stream_lets_the_next_call_through():
+    async def run():
+        cfg = fake_chutes.FaultConfig(latency=0, jitter=0, token_delay=0.05)
+        runner, url = await fake_chutes.start(cfg)
+        client = ChutesClient(api_token="test", url=url, breaker=half_open_breaker(), max_retries=0)
+        try:
+            stream = client.stream("hello")
+            assert await stream.__anext__()
+            await stream.aclose()  # the caller stops reading mid-stream
+            assert "".join([d async for d in client.stream("hello")])
+            assert client.breaker.state == "closed"
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_cancelled_caller_cancels_the_attempt_it_is_waiting_on_before_hedging():
+    async def run():
+        client = ChutesClient(api_token="test", hedge=True, max_retries=0)
+        client.latencies.extend([5.0] * 20)  # p95 of 5s: the 0.1s caller timeout lands in the first wait
+        attempts = []
+
+        async def attempt(body):
+            attempts.append(asyncio.current_task())
+            await asyncio.sleep(10)
+
+        client._attempt = attempt
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.complete("hello"), timeout=0.1)
+        await asyncio.sleep(0)
+        assert len(attempts) == 1 and attempts[0].cancelled()
+        assert client.hedges_fired == 0
+
+    asyncio.run(run())
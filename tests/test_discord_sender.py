@@ -0,0 +1,12 @@
+from discord_sender import MESSAGE_LIMIT, pack_code_blocks, pack_messages
+
+
+def test_long_stats_are_split_into_complete_code_blocks():
+    lines = [f"kimi_request_seconds{{mode=stream,n={i}}} count=12 p50=0.81s p95=1.90s" for i in range(120)]
+    messages = pack_messages(pack_code_blocks("📊 **Stats**", lines))
+    assert len(messages) > 1
+    assert messages[0].startswith("📊 **Stats**\n```\n")
+    for m in messages:
+        assert len(m) <= MESSAGE_LIMIT
+        assert m.count("```") % 2 == 0
+    assert sum(m.count("count=12") for m in messages) == len(lines)
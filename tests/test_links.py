@@ -0,0 +1,78 @@
+import asyncio
+
+from bench import fake_links
+from links import HostIndex, LinkExpander, canonicalize
+
+
+def test_canonicalize_strips_tracking_params_but_keeps_real_ones():
+    assert canonicalize("https://github.com/opentensor/btcli?utm_source=x&utm_medium=social&fbclid=abc") == (
+        "https://github.com/opentensor/btcli"
+    )
+    # ?t= is a share tag on X but a timestamp on YouTube; the rest of the query is sorted
+    assert canonicalize("https://x.com/opentensor/status/1?s=20&t=abc") == "https://x.com/opentensor/status/1"
+    assert canonicalize("https://youtube.com/watch?v=abc&t=30&si=xyz") == "https://youtube.com/watch?t=30&v=abc"
+
+
+def test_canonicalize_folds_hosts_and_trailing_slashes():
+    assert canonicalize("https://www.Twitter.com/opentensor/") == "https://x.com/opentensor"
+    assert canonicalize("https://mobile.twitter.com/opentensor") == "https://x.com/opentensor"
+    assert canonicalize("HTTPS://WWW.GitHub.com:443/opentensor/btcli/#readme") == "https://github.com/opentensor/btcli"
+    assert canonicalize("https://taostats.io/subnets/64).") == "https://taostats.io/subnets/64"
+
+
+def test_host_index_matches_subdomains_not_lookalikes():
+    index = HostIndex(["github.com", "taostats.io"])
+    assert index.match("https://docs.github.com/en") == "github.com"
+    assert "https://www.taostats.io/" in index
+    assert "https://github.com.evil.io/opentensor" not in index
+    assert "https://notgithub.com/x" not in index
+
+
+def expand(cfg, tmp_path, codes, rounds=1, timeout=5.0, budget=None):
+    """expand_all() over /s/{code} links `rounds` times on one cache; returns (base URL, [(result, outcomes)])."""
+
+    async def run():
+        runner, base = await fake_links.start(cfg)
+        expander = LinkExpander(tmp_path / "links.sqlite3", timeout=timeout, shorteners=["127.0.0.1"])
+        try:
+            results = []
+            for _ in range(rounds):
+                outcomes = []
+                expander.on_result = outcomes.append
+                results.append((await expander.expand_all([f"{base}/s/{c}" for c in codes], budget), outcomes))
+            return base, results
+        finally:
+            await expander.close()
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+
+def test_expander_follows_the_redirect_chain_to_a_canonical_target(tmp_path):
+    cfg = fake_links.RedirectConfig(latency=0, dead={"gone"})
+    base, [(out, outcomes)] = expand(cfg, tmp_path, ["btcli", "gone"])
+    assert out == {f"{base}/s/btcli": "https://github.com/opentensor/btcli"}
+    assert sorted(outcomes) == ["expanded", "failed"]
+    assert cfg.requests == 3  # /s/btcli, /r/btcli, /s/gone; the target itself is never fetched
+
+
+def test_expander_serves_repeat_links_from_its_cache(tmp_path):
+    cfg = fake_links.RedirectConfig(latency=0, dead={"gone"})
+    base, [(first, _), (second, outcomes)] = expand(cfg, tmp_path, ["btcli", "gone"], rounds=2)
+    assert second == first == {f"{base}/s/btcli": "https://github.com/opentensor/btcli"}
+    assert outcomes == ["cached", "cached"]  # the dead link is cached as itself, not retried
+    assert cfg.requests == 3
+
+
+def test_expander_gives_up_on_a_slow_link_after_its_timeout(tmp_path):
+    cfg = fake_links.RedirectConfig(latency=1.0)
+    _, [(out, outcomes)] = expand(cfg, tmp_path, ["slow"], timeout=0.1)
+    assert out == {}
+    assert outcomes == ["failed"]
+
+
+def test_expander_returns_what_finished_within_the_budget(tmp_path):
+    cfg = fake_links.RedirectConfig(latency=1.0)
+    _, [(out, outcomes)] = expand(cfg, tmp_path, ["a", "b"], budget=0.1)
+    assert out == {}
+    assert outcomes == ["timeout", "timeout"]
@@ -0,0 +1,21 @@
+import datetime as dt
+import json
+
+from post_store import PostStore
+from posts import Post
+
+
+def test_scraped_tweet_replaces_its_legacy_jsonl_copy(tmp_path):
+    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    records = [{"date": (now - dt.timedelta(hours=h)).isoformat(), "content": f"post {h}", "outlinks": []} for h in (1, 2)]
+    (tmp_path / "kol.jsonl").write_text("\n".join(json.dumps(r) for r in records), encoding="utf-8")
+    store = PostStore(tmp_path / "posts.sqlite3")
+    assert store.import_jsonl_dir(tmp_path) == 2
+
+    scraped = Post(id="1800000000000000001", handle="kol", created_at=(now - dt.timedelta(hours=1)).timestamp(), text="post 1")
+    assert store.add_posts([scraped]) == 1
+    posts = store.posts_since("kol", now - dt.timedelta(days=1))
+    assert sorted((p.id.startswith("legacy:"), p.text) for p in posts) == [(False, "post 1"), (True, "post 2")]
+
+    assert store.import_jsonl_dir(tmp_path, force=True) == 0  # re-import doesn't bring the copy back
+    assert len(store.posts_since("kol", now - dt.timedelta(days=1))) == 2
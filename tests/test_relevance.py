@@ -0,0 +1,46 @@
+from posts import Post
+from relevance import select_relevant
+
+ON_TOPIC = [
+    "Been running our agents on Chutes for a month now. Paid inference finally makes sense for us: the latency "
+    "is fine, the pricing is transparent and we stopped juggling three different providers. If you're building "
+    "anything with open models it's worth a look.",
+    "Everyone keeps asking where decentralized compute goes next. Training, serving, verification: all of it is "
+    "moving on-chain faster than people think, and Bittensor is leading it.",
+    "New release of btcli is out https://github.com/opentensor/btcli/releases",
+    "SN64 emissions up again this week",
+]
+OFF_TOPIC = [
+    "Great dinner tonight with the family, the pasta was amazing and the kids loved the dessert.",
+    "Reminder that the conference early-bird tickets close on Friday. See you in Lisbon!",
+    "Hot take: most productivity apps are just to-do lists with a subscription attached.",
+]
+
+
+def post(i: int, text: str) -> Post:
+    return Post(id=str(i), handle="kol", created_at=0.0, text=text)
+
+
+def test_on_topic_posts_are_kept_whatever_their_length():
+    posts = [post(i, t) for i, t in enumerate(ON_TOPIC + OFF_TOPIC)]
+    kept, dropped = select_relevant({"kol": posts}, top_k=0)
+    assert [p.text for p in kept["kol"]] == ON_TOPIC
+    assert dropped == len(OFF_TOPIC)
+
+
+def test_top_k_prefers_the_most_on_topic_posts():
+    posts = [post(0, OFF_TOPIC[0]), post(1, "Bittensor subnet emissions and validator weights, root and alpha"),
+             post(2, ON_TOPIC[1])]
+    kept, dropped = select_relevant({"kol": posts}, top_k=1)
+    assert [p.id for p in kept["kol"]] == ["1"]
+    assert dropped == 2
+
+
+def test_only_exact_vocabulary_terms_count():
+    # thousands of distinct off-topic words: none may land on a vocabulary term
+    words = [f"w{i:05d}" for i in range(20000)]
+    posts = [post(i, " ".join(words[i * 50:(i + 1) * 50])) for i in range(len(words) // 50)]
+    posts.append(post(999, "validators take note"))
+    kept, dropped = select_relevant({"kol": posts}, top_k=0)
+    assert [p.id for p in kept["kol"]] == ["999"]
+    assert dropped == len(posts) - 1
@@ -0,0 +1,39 @@
+from posts import Post
+from story_dedup import split_shared_stories
+
+
+def post(handle: str, i: int, text: str, link: str) -> Post:
+    return Post(id=f"{handle}-{i}", handle=handle, created_at=0.0, text=text, links=[link])
+
+
+def test_a_site_one_kol_always_links_is_not_a_story():
+    texts = [
+        "Subnet 19 emissions climbed again overnight",
+        "Root weights shifted after the latest epoch",
+        "Three validators changed their take today",
+        "Registration cost for new subnets dropped",
+        "Alpha token prices are mixed this morning",
+        "Top miners by incentive this week",
+    ]
+    posts = {
+        "SubnetStats": [post("SubnetStats", i, t, f"https://taostats.io/subnets/{i}") for i, t in enumerate(texts)]
+        + [post("SubnetStats", 9, "Daily dashboard refresh", "https://taostats.io")],
+        "TAOTemplar": [post("TAOTemplar", 0, "Templar training run hit a new loss record", "https://taostats.io")],
+    }
+    posts["SubnetStats"] += [post("SubnetStats", 10 + i, "Weekly recap", "https://taostats.io/recap") for i in range(3)]
+    posts["TAOTemplar"].append(post("TAOTemplar", 1, "Gradient compression results", "https://taostats.io/recap"))
+    stories, own, _ = split_shared_stories(posts)
+    assert stories == []
+    assert own == posts
+
+
+def test_same_article_with_similar_commentary_is_one_story():
+    link = "https://blog.bittensor.com/dynamic-tao-launch"
+    posts = {
+        "a": [post("a", 0, "Dynamic TAO launch date is confirmed, subnet alpha tokens go live", link)],
+        "b": [post("b", 0, "Big one: dynamic TAO launch confirmed and alpha tokens are coming", link + "?utm_source=x")],
+        "c": [post("c", 0, "Lovely weather for a hike today", link)],
+    }
+    stories, own, _ = split_shared_stories(posts)
+    assert len(stories) == 1 and stories[0].handles == ["a", "b"]
+    assert own["c"] == posts["c"]
@@ -0,0 +1,12 @@
+from subnet_registry import SUBNET_TOKEN, convo_text
+
+
+def test_a_bare_subnet_token_has_no_convo_text():
+    for content in ("62", "62-", " ridges", "ridges-62", "ridges."):
+        assert SUBNET_TOKEN.match(content)
+        assert convo_text(content) == ""
+
+
+def test_pasted_text_keeps_everything_but_a_leading_netuid():
+    assert convo_text("62 - miners are upset about the new weights") == "miners are upset about the new weights"
+    assert convo_text("ridges validators went quiet today") == "ridges validators went quiet today"
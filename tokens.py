@@ -0,0 +1,74 @@
+"""
+Cheap local token estimates and conversation chunking for Kimi prompts.
+
+No tokenizer download: ~4 characters per token is close enough for English
+chat text to keep prompts inside the 75k context with room to spare.
+"""
+import re
+from typing import List
+
+CHARS_PER_TOKEN = 4
+
+# a new chat message usually starts with a timestamp or "name — date" header
+_MESSAGE_HEADER = re.compile(
+    r"^\s*(\[\d{1,4}[/\-.]\d{1,2}[/\-.]\d{1,4}[^\]]*\]"   # [10/17/2026 8:01 AM] ...
+    r"|\S.{0,40}\s[—–-]\s.*\d{1,2}:\d{2}"                  # name — Today at 8:01
+    r"|\d{1,2}:\d{2}\s)"                                   # 08:01 name: ...
+)
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_messages(text: str) -> List[str]:
+    """Split a pasted conversation into messages (header lines / blank lines start a new one)."""
+    messages: List[str] = []
+    current: List[str] = []
+    for line in text.splitlines():
+        if not line.strip() or _MESSAGE_HEADER.match(line):
+            if current:
+                messages.append("\n".join(current))
+                current = []
+            if not line.strip():
+                continue
+        current.append(line)
+    if current:
+        messages.append("\n".join(current))
+    return messages
+
+
+def chunk_conversation(text: str, max_tokens: int) -> List[str]:
+    """
+    Pack whole messages into chunks of at most ~max_tokens each. A single
+    message larger than the budget is cut on line, then character, bounds.
+    """
+    budget_chars = max(1, max_tokens) * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+
+    def flush():
+        nonlocal current, size
+        if current:
+            chunks.append("\n".join(current))
+        current, size = [], 0
+
+    for msg in split_messages(text):
+        pieces = [msg]
+        if len(msg) > budget_chars:
+            pieces = []
+            for line in msg.splitlines():
+                while len(line) > budget_chars:
+                    pieces.append(line[:budget_chars])
+                    line = line[budget_chars:]
+                pieces.append(line)
+        for piece in pieces:
+            if size and size + len(piece) + 1 > budget_chars:
+                flush()
+            current.append(piece)
+            size += len(piece) + 1
+    flush()
+    return chunks